@@ -1,7 +1,12 @@
 import os
+import io
+import sys
+import csv
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from dotenv import load_dotenv, set_key
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from dotenv import load_dotenv
 import urllib.parse
 
 # 配置
@@ -11,9 +16,84 @@ ENV_FILE_PATH = ".env"
 # 加载环境变量
 load_dotenv(ENV_FILE_PATH)
 
+# 账号注册表和平台插件在coordinator目录中
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'coordinator'))
+from account_registry import AccountRegistry, parse_account_settings, validate_account
+from platforms import supported_platforms
+
+class StaticAsset:
+    """缓存在内存中的静态文件，文件修改后自动重新读取"""
+
+    def __init__(self, path):
+        self.path = path
+        self.body = b''
+        self.etag = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """返回(内容, ETag)，每次只检查一次文件修改时间"""
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, 'rb') as file:
+                    self.body = file.read()
+                self.etag = '"' + hashlib.blake2b(self.body, digest_size=16).hexdigest() + '"'
+                self._mtime = mtime
+            return self.body, self.etag
+
+STATIC_ASSETS = {
+    '/': StaticAsset('config.html'),
+    '/index.html': StaticAsset('config.html')
+}
+
+# 目标账号注册表，协调器从中读取账号变更
+registry = AccountRegistry()
+# 启动脚本先启动配置服务器：注册表从未写入过时先导入.env中的账号，
+# 否则页面显示空列表，第一次保存后.env中的账号就再也不会被导入
+if registry.seed(parse_account_settings(os.environ)):
+    print(f'已从环境变量导入{registry.count()}个目标账号到账号注册表')
+
+# 批量导入时每批写入的账号数
+IMPORT_BATCH_SIZE = 500
+# 导入结果中最多返回的错误行数
+IMPORT_MAX_ERRORS = 100
+# 分页列出账号时每页的默认和最大条数
+LIST_DEFAULT_LIMIT = 100
+LIST_MAX_LIMIT = 1000
+
+class IncompleteBody(Exception):
+    """请求体在声明的长度或结束块之前中断"""
+
+def parse_account_lines(lines, data_format):
+    """逐行解析导入的账号，产出(行号, 平台, 账号)或(行号, None, 错误说明)
+
+    CSV每行为"平台,账号"(可带表头)或"平台:账号"；JSON Lines每行为{"platform": ..., "username": ...}。
+    """
+    if data_format == 'csv':
+        for line_number, row in enumerate(csv.reader(lines), 1):
+            row = [field.strip() for field in row]
+            if not any(row) or (line_number == 1 and row[:2] == ['platform', 'username']):
+                continue
+            if len(row) == 1 and ':' in row[0]:
+                row = row[0].split(':', 1)
+            if len(row) < 2:
+                yield line_number, None, "需要平台和账号两列"
+                continue
+            yield line_number, row[0], row[1].lstrip('@')
+    else:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                yield line_number, str(entry['platform']).strip(), str(entry['username']).strip().lstrip('@')
+            except (ValueError, KeyError, TypeError) as e:
+                yield line_number, None, f"无效的JSON行: {str(e)}"
+
 class ConfigHandler(BaseHTTPRequestHandler):
-    def _set_headers(self, content_type='text/html'):
-        self.send_response(200)
+    def _set_headers(self, content_type='text/html', status=200):
+        self.send_response(status)
         self.send_header('Content-type', content_type)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
@@ -23,23 +103,137 @@ class ConfigHandler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         self._set_headers()
     
+    def _send_json(self, data, status=200):
+        self._set_headers('application/json', status)
+        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+    
+    def _is_chunked(self):
+        return 'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+    
+    def _iter_body_blocks(self):
+        """按块读取请求体，支持Content-Length和Transfer-Encoding: chunked，中断时抛出IncompleteBody"""
+        if not self._is_chunked():
+            remaining = int(self.headers.get('Content-Length') or 0)
+            while remaining > 0:
+                block = self.rfile.read(min(remaining, 65536))
+                if not block:
+                    raise IncompleteBody()
+                remaining -= len(block)
+                yield block
+            return
+        while True:
+            try:
+                size = int(self.rfile.readline(65537).split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise IncompleteBody()
+            if size == 0:
+                # 跳过可能存在的trailer，直到空行
+                while self.rfile.readline(65537) not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            while size > 0:
+                block = self.rfile.read(min(size, 65536))
+                if not block:
+                    raise IncompleteBody()
+                size -= len(block)
+                yield block
+            self.rfile.readline(65537)
+    
+    def _iter_body_lines(self):
+        """按行流式读取请求体，不把整个上传内容读入内存"""
+        pending = b''
+        first = True
+        for block in self._iter_body_blocks():
+            lines = (pending + block).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                text = line.decode('utf-8', errors='replace') + '\n'
+                if first:
+                    text = text.lstrip('\ufeff')
+                    first = False
+                yield text
+        if pending:
+            text = pending.decode('utf-8', errors='replace')
+            yield text.lstrip('\ufeff') if first else text
+    
+    def _data_format(self, query):
+        data_format = query.get('format', [''])[0].lower()
+        if not data_format:
+            content_type = self.headers.get('Content-Type', '')
+            data_format = 'jsonl' if 'json' in content_type else 'csv'
+        return data_format if data_format in ('csv', 'jsonl') else None
+    
     def do_GET(self):
-        if self.path == '/' or self.path == '/index.html':
-            # 返回配置页面
-            with open('config.html', 'rb') as file:
-                self._set_headers()
-                self.wfile.write(file.read())
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if url.path in STATIC_ASSETS:
+            # 返回配置页面，内容未变化时只返回304
+            body, etag = STATIC_ASSETS[url.path].load()
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
         
-        elif self.path == '/get-target-accounts':
-            # 获取环境变量中的目标账号配置
-            config = {
-                'twitter': os.getenv('TWITTER_ACCOUNTS', '').split(',') if os.getenv('TWITTER_ACCOUNTS') else [],
-                'xiaohongshu': os.getenv('XIAOHONGSHU_ACCOUNTS', '').split(',') if os.getenv('XIAOHONGSHU_ACCOUNTS') else []
-            }
-            
-            # 过滤空值
-            for platform in config:
-                config[platform] = [account for account in config[platform] if account]
+        elif url.path == '/accounts':
+            # 分页列出账号: /accounts?platform=twitter&offset=0&limit=100
+            platform = query.get('platform', [''])[0]
+            try:
+                offset = max(0, int(query.get('offset', ['0'])[0]))
+                limit = min(LIST_MAX_LIMIT, max(1, int(query.get('limit', [str(LIST_DEFAULT_LIMIT)])[0])))
+            except ValueError:
+                self._send_json({'success': False, 'message': 'offset和limit必须是整数'}, 400)
+                return
+            rows = registry.page(platform or None, offset, limit)
+            total = registry.count(platform or None)
+            self._send_json({
+                'total': total,
+                'offset': offset,
+                'limit': limit,
+                'next_offset': offset + len(rows) if offset + len(rows) < total else None,
+                'accounts': [
+                    {'platform': row[0], 'username': row[1], 'added_at': row[2]} for row in rows
+                ]
+            })
+        
+        elif url.path == '/accounts/export':
+            # 流式导出全部账号: /accounts/export?format=csv|jsonl
+            data_format = self._data_format(query)
+            if data_format is None:
+                self._send_json({'success': False, 'message': '格式只支持csv或jsonl'}, 400)
+                return
+            self.send_response(200)
+            self.send_header('Content-type', 'text/csv; charset=utf-8' if data_format == 'csv'
+                             else 'application/x-ndjson; charset=utf-8')
+            self.send_header('Content-Disposition', f'attachment; filename="accounts.{data_format}"')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator='\n')
+            if data_format == 'csv':
+                writer.writerow(['platform', 'username'])
+            for index, (platform, username) in enumerate(registry.iter_accounts(), 1):
+                if data_format == 'csv':
+                    writer.writerow([platform, username])
+                else:
+                    buffer.write(json.dumps({'platform': platform, 'username': username}, ensure_ascii=False) + '\n')
+                if index % IMPORT_BATCH_SIZE == 0:
+                    self.wfile.write(buffer.getvalue().encode('utf-8'))
+                    buffer.seek(0)
+                    buffer.truncate()
+            self.wfile.write(buffer.getvalue().encode('utf-8'))
+        
+        elif url.path == '/get-target-accounts':
+            # 获取账号注册表中的目标账号
+            accounts = registry.accounts()
+            config = {platform: accounts.get(platform, []) for platform in supported_platforms()}
             
             self._set_headers('application/json')
             self.wfile.write(json.dumps(config).encode())
@@ -49,38 +243,88 @@ class ConfigHandler(BaseHTTPRequestHandler):
             self.end_headers()
     
     def do_POST(self):
-        if self.path == '/save-target-accounts':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            config = json.loads(post_data.decode('utf-8'))
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if url.path == '/accounts/import':
+            # 批量导入账号: /accounts/import?format=csv|jsonl&mode=merge|replace
+            # merge只加入新账号；replace以导入内容为准，移除不在其中的账号
+            # replace的内容为空时拒绝执行，除非带allow_empty=1
+            data_format = self._data_format(query)
+            mode = query.get('mode', ['merge'])[0]
+            if data_format is None or mode not in ('merge', 'replace'):
+                self._send_json({'success': False, 'message': '格式只支持csv或jsonl，模式只支持merge或replace'}, 400)
+                return
             
-            # 更新环境变量文件
-            with open(ENV_FILE_PATH, 'r') as file:
-                env_content = file.read()
+            if not self._is_chunked() and self.headers.get('Content-Length') is None:
+                # 读不到请求体长度时无法判断上传是否完整，replace会把空内容当成删除全部账号
+                self._send_json({'success': False, 'message': '需要Content-Length或Transfer-Encoding: chunked'}, 411)
+                return
             
-            # 提取已有的非账号配置
-            env_lines = env_content.splitlines()
-            preserved_lines = []
-            for line in env_lines:
-                if not (line.startswith('TWITTER_ACCOUNTS=') or 
-                        line.startswith('XIAOHONGSHU_ACCOUNTS=') or 
-                        line.startswith('TARGET_ACCOUNTS=')):
-                    preserved_lines.append(line)
+            platforms = supported_platforms()
+            errors = []
+            invalid = 0
+            valid = 0
+            added = removed = 0
+            batch = []
+            wanted = {}
+            try:
+                for line_number, platform, username in parse_account_lines(self._iter_body_lines(), data_format):
+                    error = username if platform is None else validate_account(platform, username, platforms)
+                    if error:
+                        invalid += 1
+                        if len(errors) < IMPORT_MAX_ERRORS:
+                            errors.append({'line': line_number, 'error': error})
+                        continue
+                    valid += 1
+                    if mode == 'replace':
+                        wanted.setdefault(platform, []).append(username)
+                        continue
+                    batch.append((platform, username))
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        added += registry.add_many(batch)
+                        batch = []
+            except IncompleteBody:
+                # 上传中断时已解析的内容不完整，replace会误删账号；merge已写入的批次保留
+                self._send_json({'success': False, 'message': f'请求体不完整，已导入{added}个账号后中断'}, 400)
+                return
+            if batch:
+                added += registry.add_many(batch)
+            if mode == 'replace':
+                if invalid:
+                    # 有无效行时不做替换，避免误删账号
+                    self._send_json({'success': False, 'message': f'有{invalid}行无效，未做替换',
+                                     'invalid': invalid, 'errors': errors}, 400)
+                    return
+                if not valid and query.get('allow_empty', [''])[0] != '1':
+                    # 没有任何有效账号时替换等于清空注册表，需调用方以allow_empty=1明确确认
+                    self._send_json({'success': False, 'message': '导入内容中没有有效账号，未做替换'
+                                     '(确需清空全部账号时加参数allow_empty=1)'}, 400)
+                    return
+                added, removed = registry.replace(wanted)
             
-            # 添加新的账号配置
-            for var_name, value in config.items():
-                if value:  # 只添加非空值
-                    preserved_lines.append(f"{var_name}={value}")
-            
-            # 写回环境变量文件
-            with open(ENV_FILE_PATH, 'w') as file:
-                file.write('\n'.join(preserved_lines))
+            self._send_json({
+                'success': invalid == 0,
+                'message': f'导入{valid}个账号(新增{added}个，移除{removed}个)，无效{invalid}行',
+                'valid': valid,
+                'added': added,
+                'removed': removed,
+                'invalid': invalid,
+                'errors': errors
+            })
+        
+        elif url.path == '/save-target-accounts':
+            content_length = int(self.headers['Content-Length'])
+            post_data = self.rfile.read(content_length)
+            config = json.loads(post_data.decode('utf-8'))
             
-            # 重新加载环境变量
-            load_dotenv(ENV_FILE_PATH, override=True)
+            # 页面提交环境变量格式的配置，与注册表比较后只记录新增和移除的账号
+            added, removed = registry.replace(parse_account_settings(config))
             
             self._set_headers('application/json')
-            self.wfile.write(json.dumps({'success': True, 'message': '配置已保存'}).encode())
+            self.wfile.write(json.dumps({
+                'success': True,
+                'message': f'配置已保存(新增{added}个账号，移除{removed}个账号)'
+            }).encode())
         
         else:
             self.send_response(404)
@@ -88,7 +332,8 @@ class ConfigHandler(BaseHTTPRequestHandler):
 
 def run_server():
     server_address = ('', CONFIG_PORT)
-    httpd = HTTPServer(server_address, ConfigHandler)
+    # 每个请求在独立线程中处理，慢客户端或大批量导入不会阻塞其他请求
+    httpd = ThreadingHTTPServer(server_address, ConfigHandler)
     print(f'配置服务器运行在 http://localhost:{CONFIG_PORT}')
     httpd.serve_forever()
 
@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+import threading
+
+from platforms import supported_platforms
+from sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# 目标账号注册表的存放位置，配置服务器和协调器共用
+ACCOUNT_REGISTRY_PATH = os.getenv('ACCOUNT_REGISTRY_PATH', 'coordinator/state/accounts.db')
+
+def parse_account_settings(values):
+    """从环境变量格式的配置(TARGET_ACCOUNTS、<平台>_ACCOUNTS)解析目标账号，去除重复"""
+    platforms = supported_platforms()
+    target_accounts = {}
+
+    def add(platform, username):
+        accounts = target_accounts.setdefault(platform, [])
+        if username not in accounts:
+            accounts.append(username)
+
+    # TARGET_ACCOUNTS: platform:username，省略平台时默认为Twitter账号
+    for account in values.get('TARGET_ACCOUNTS', '').split(','):
+        account = account.strip()
+        if not account:
+            continue
+        if ':' in account:
+            platform, username = account.split(':', 1)
+            if platform in platforms:
+                add(platform, username)
+        else:
+            add('twitter', account)
+
+    # 平台特定的配置
+    for platform in platforms:
+        for account in values.get(f"{platform.upper()}_ACCOUNTS", '').split(','):
+            if account.strip():
+                add(platform, account.strip())
+
+    return target_accounts
+
+def validate_account(platform, username, platforms=None):
+    """检查账号是否可以加入注册表，返回错误说明，有效时返回None"""
+    platforms = supported_platforms() if platforms is None else platforms
+    if platform not in platforms:
+        return f"不支持的平台: {platform}"
+    if not username:
+        return "账号为空"
+    if any(char.isspace() or char in ',:' for char in username):
+        return f"账号包含空白、逗号或冒号: {username}"
+    return None
+
+class AccountRegistry:
+    """目标账号注册表，带版本号的变更记录
+
+    每次增删账号都在account_changes中追加一条记录(自增版本号)，
+    常驻的协调器只需比较最新版本号，有变化时读取此后的变更增量调度，无需重启。
+    """
+
+    def __init__(self, path=ACCOUNT_REGISTRY_PATH):
+        self._lock = threading.Lock()
+        # 配置服务器和协调器在不同进程中读写，等待对方的写事务结束；账号变更保持完整同步
+        self._conn = connect(path, synchronous=None, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            "platform TEXT NOT NULL, "
+            "username TEXT NOT NULL, "
+            "added_at REAL NOT NULL, "
+            "PRIMARY KEY (platform, username)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS account_changes ("
+            "version INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "platform TEXT NOT NULL, "
+            "username TEXT NOT NULL, "
+            "action TEXT NOT NULL, "
+            "changed_at REAL NOT NULL"
+            ")"
+        )
+        self._conn.commit()
+
+    def version(self):
+        """最新的变更版本号，从未写入过时为0"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(version), 0) FROM account_changes").fetchone()[0]
+
+    def accounts(self):
+        """当前的目标账号，按加入顺序返回{平台: [账号]}"""
+        target_accounts = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT platform, username FROM accounts ORDER BY added_at").fetchall()
+        for platform, username in rows:
+            target_accounts.setdefault(platform, []).append(username)
+        return target_accounts
+
+    def _apply(self, additions, removals):
+        now = time.time()
+        added = 0
+        removed = 0
+        for platform, username in additions:
+            cursor = self._conn.execute("INSERT OR IGNORE INTO accounts VALUES (?, ?, ?)", (platform, username, now))
+            if cursor.rowcount:
+                self._conn.execute("INSERT INTO account_changes (platform, username, action, changed_at) "
+                                   "VALUES (?, ?, 'add', ?)", (platform, username, now))
+                added += 1
+        for platform, username in removals:
+            cursor = self._conn.execute("DELETE FROM accounts WHERE platform = ? AND username = ?",
+                                        (platform, username))
+            if cursor.rowcount:
+                self._conn.execute("INSERT INTO account_changes (platform, username, action, changed_at) "
+                                   "VALUES (?, ?, 'remove', ?)", (platform, username, now))
+                removed += 1
+        return added, removed
+
+    def count(self, platform=None):
+        with self._lock:
+            if platform:
+                return self._conn.execute("SELECT COUNT(*) FROM accounts WHERE platform = ?", (platform,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+
+    def page(self, platform=None, offset=0, limit=100):
+        """按(平台, 账号)顺序分页列出账号，返回[(平台, 账号, 加入时间)]"""
+        query = "SELECT platform, username, added_at FROM accounts"
+        params = []
+        if platform:
+            query += " WHERE platform = ?"
+            params.append(platform)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY platform, username LIMIT ? OFFSET ?",
+                                      params + [limit, offset]).fetchall()
+
+    def iter_accounts(self, batch_size=500):
+        """按主键顺序逐批读取全部账号，导出大量账号时不必一次载入内存"""
+        last = ('', '')
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT platform, username FROM accounts WHERE (platform, username) > (?, ?) "
+                    "ORDER BY platform, username LIMIT ?", (*last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1]
+
+    def add(self, platform, usernames):
+        """加入账号，返回实际新增的数量"""
+        return self.add_many([(platform, username) for username in usernames])
+
+    def add_many(self, accounts):
+        """加入[(平台, 账号)]，返回实际新增的数量"""
+        with self._lock, self._conn:
+            return self._apply(accounts, [])[0]
+
+    def remove(self, platform, usernames):
+        """移除账号，返回实际移除的数量"""
+        with self._lock, self._conn:
+            return self._apply([], [(platform, username) for username in usernames])[1]
+
+    def replace(self, target_accounts):
+        """整体替换为新的账号列表，只记录差异，返回(新增数, 移除数)"""
+        wanted = [(platform, username) for platform, accounts in target_accounts.items() for username in accounts]
+        with self._lock, self._conn:
+            current = set(self._conn.execute("SELECT platform, username FROM accounts").fetchall())
+            wanted_set = set(wanted)
+            return self._apply([account for account in wanted if account not in current],
+                               [account for account in current if account not in wanted_set])
+
+    def changes_since(self, version):
+        """读取版本号之后的变更，返回(最新版本号, 新增的[(平台, 账号)], 移除的[(平台, 账号)])
+
+        同一账号多次变更时以最后一次为准。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, platform, username, action FROM account_changes WHERE version > ? ORDER BY version",
+                (version,)
+            ).fetchall()
+        latest = {}
+        for row_version, platform, username, action in rows:
+            version = row_version
+            latest.pop((platform, username), None)
+            latest[(platform, username)] = action
+        added = [account for account, action in latest.items() if action == 'add']
+        removed = [account for account, action in latest.items() if action == 'remove']
+        return version, added, removed
+
+    def seed(self, target_accounts):
+        """注册表从未写入过时导入已有的账号配置(环境变量)，之后以注册表为准
+
+        注册表已有记录而环境变量中的账号与之不同时，环境变量被忽略，记录警告。
+        """
+        if not target_accounts:
+            return False
+        if self.version():
+            configured = {(platform, username) for platform, accounts in target_accounts.items()
+                          for username in accounts}
+            registered = {(platform, username) for platform, accounts in self.accounts().items()
+                          for username in accounts}
+            if configured != registered:
+                logger.warning(f"环境变量中的目标账号与账号注册表不一致(仅在环境变量中{len(configured - registered)}个，"
+                               f"仅在注册表中{len(registered - configured)}个)，以注册表为准，"
+                               f"环境变量中的账号配置已被忽略，请通过配置页面管理账号")
+            return False
+        added, _ = self.replace(target_accounts)
+        logger.info(f"已从环境变量导入{added}个目标账号到账号注册表，之后请通过配置页面管理账号")
+        return True
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
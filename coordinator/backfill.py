@@ -0,0 +1,140 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# 回填游标的保存位置，中断后下次从游标处继续
+BACKFILL_STATE_PATH = os.getenv('BACKFILL_STATE_PATH', 'coordinator/state/backfill_cursors.json')
+# 默认回填最近多少天的内容
+BACKFILL_SINCE_DAYS = int(os.getenv('BACKFILL_SINCE_DAYS', '90'))
+# 单个账号每次运行最多翻多少页，剩余的下次继续
+BACKFILL_MAX_PAGES = int(os.getenv('BACKFILL_MAX_PAGES', '50'))
+
+def default_since():
+    return (datetime.now() - timedelta(days=BACKFILL_SINCE_DAYS)).strftime('%Y-%m-%d')
+
+class BackfillCursors:
+    """每个账号的回填进度：下一页游标、已翻页数、最早内容时间和是否完成"""
+
+    def __init__(self, path=BACKFILL_STATE_PATH):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError as e:
+            logger.warning(f"回填游标文件无效，从头开始: {str(e)}")
+
+    def get(self, key):
+        with self._lock:
+            return dict(self._entries.get(key, {}))
+
+    def update(self, key, **values):
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            entry.update(values, updated_at=datetime.now().isoformat())
+            self._save()
+
+    def reset(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存回填游标失败: {str(e)}")
+
+class Backfill:
+    """沿个人主页的分页逐页向前抓取账号的历史内容
+
+    每个账号翻到发布时间早于since的内容、遇到回填开始前就已发送过的帖子(stop_at_seen)
+    或没有下一页时结束；翻页上限、请求失败或收到停止信号时保存游标，下次从游标处继续。
+    页面通过fetch_page(platform, username, cursor, stop_event)获取，
+    返回(HTML, 下一页游标)或None，由调用方决定以低优先级限速。
+    """
+
+    def __init__(self, fetch_page, extract, seen_index=None, since=None, stop_at_seen=True,
+                 max_pages=BACKFILL_MAX_PAGES, cursors=None, restart=False):
+        self.fetch_page = fetch_page
+        self.extract = extract
+        self.seen_index = seen_index
+        self.since = since or default_since()
+        self.stop_at_seen = stop_at_seen
+        self.max_pages = max_pages
+        self.cursors = cursors or BackfillCursors()
+        self.restart = restart
+        self.stats = {"accounts": 0, "pages": 0, "items": 0}
+        # 常驻模式下常规抓取与回填同时运行，会先发送账号最新一页；
+        # 只有回填开始前就已发送的帖子才是追赶回填的终点
+        self.started_at = datetime.now().isoformat()
+
+    def run(self, target_accounts, stop_event=None):
+        """逐页产出所有账号的历史内容列表，可直接交给Pipeline处理"""
+        for platform, usernames in target_accounts.items():
+            for username in usernames:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                yield from self.backfill_account(platform, username, stop_event)
+        logger.info(f"回填完成: {self.stats['accounts']}个账号，{self.stats['pages']}页，"
+                    f"{self.stats['items']}条内容")
+
+    def backfill_account(self, platform, username, stop_event=None):
+        key = f"{platform}:{username}"
+        if self.restart:
+            self.cursors.reset(key)
+        entry = self.cursors.get(key)
+        if entry.get("done") and not self.stop_at_seen and entry.get("since", "") <= self.since:
+            # 已回填到同样早的日期；追赶模式(stop_at_seen)每次都从最新一页重新开始
+            return
+        cursor = None if entry.get("done") else entry.get("cursor")
+        if cursor:
+            logger.info(f"继续回填{key}，从第{entry.get('pages', 0) + 1}页开始")
+        else:
+            logger.info(f"开始回填{key}，截止到{self.since}")
+        self.stats["accounts"] += 1
+
+        pages = 0 if entry.get("done") else entry.get("pages", 0)
+        oldest = entry.get("oldest")
+        for _ in range(self.max_pages):
+            page = self.fetch_page(platform, username, cursor, stop_event)
+            if page is None:
+                logger.warning(f"回填{key}中断，下次从第{pages + 1}页继续")
+                return
+            html_content, next_cursor = page
+            items = self.extract(platform, html_content, username)
+            pages += 1
+
+            kept = [item for item in items if item.get("timestamp", "") >= self.since]
+            reached_cutoff = len(kept) < len(items)
+            reached_seen = bool(self.stop_at_seen and self.seen_index and kept
+                                and self.seen_index.count_seen(kept, before=self.started_at))
+            if kept:
+                page_oldest = min(item.get("timestamp", "") for item in kept)
+                oldest = min(oldest, page_oldest) if oldest else page_oldest
+                self.stats["items"] += len(kept)
+                yield kept
+            self.stats["pages"] += 1
+
+            done = reached_cutoff or reached_seen or not next_cursor
+            self.cursors.update(key, cursor=None if done else next_cursor, pages=pages,
+                                oldest=oldest, since=self.since, done=done)
+            if done:
+                reason = "到达截止日期" if reached_cutoff else "遇到已发送的帖子" if reached_seen else "没有更多页面"
+                logger.info(f"{key}回填结束({reason})，共{pages}页")
+                return
+            cursor = next_cursor
+        logger.info(f"{key}本次已回填{self.max_pages}页，下次继续")
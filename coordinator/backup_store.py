@@ -0,0 +1,163 @@
+import os
+import sys
+import glob
+import gzip
+import json
+import logging
+import argparse
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'coordinator/backup')
+# 每个分区缓冲多少条内容后写入一个gzip段，过小会降低压缩率
+BACKUP_FLUSH_SIZE = int(os.getenv('BACKUP_FLUSH_SIZE', '1000'))
+
+def partition_day(item):
+    """内容所属的日期分区(按收集时间)"""
+    collected_at = item.get("collected_at", "")
+    return collected_at[:10] if len(collected_at) >= 10 else datetime.now().strftime('%Y-%m-%d')
+
+def to_iso(value):
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+class BackupStore:
+    """按平台和日期分区的压缩备份
+
+    目录结构: <backup_dir>/<平台>/<YYYY-MM-DD>.jsonl.gz，每行一条内容。
+    写入按分区缓冲，攒够一批后作为一个gzip段追加到分区文件(多段gzip可直接顺序解压)。
+    """
+
+    def __init__(self, backup_dir=BACKUP_DIR, flush_size=BACKUP_FLUSH_SIZE):
+        self.backup_dir = backup_dir
+        self.flush_size = flush_size
+        self._buffers = {}
+        self._written = 0
+        self._lock = threading.Lock()
+
+    def partition_path(self, platform, day):
+        return os.path.join(self.backup_dir, platform, f"{day}.jsonl.gz")
+
+    def write(self, items):
+        with self._lock:
+            for item in items:
+                key = (item.get("platform", "unknown"), partition_day(item))
+                buffer = self._buffers.setdefault(key, [])
+                buffer.append(json.dumps(item, ensure_ascii=False))
+                if len(buffer) >= self.flush_size:
+                    self._flush_partition(key)
+
+    def _flush_partition(self, key):
+        lines = self._buffers.pop(key, None)
+        if not lines:
+            return
+        path = self.partition_path(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, 'ab') as f:
+            f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        self._written += len(lines)
+
+    def flush(self):
+        with self._lock:
+            for key in list(self._buffers):
+                self._flush_partition(key)
+
+    def close(self):
+        self.flush()
+        if self._written:
+            logger.info(f"备份数据保存到: {self.backup_dir} (本次{self._written}条)")
+            self._written = 0
+
+    def partitions(self, platform=None, since=None, until=None):
+        """列出与条件相交的分区文件，按平台、日期排序"""
+        since_day = to_iso(since)[:10] if since else None
+        until_day = to_iso(until)[:10] if until else None
+        if platform:
+            platforms = [platform]
+        elif os.path.isdir(self.backup_dir):
+            platforms = sorted(
+                name for name in os.listdir(self.backup_dir)
+                if os.path.isdir(os.path.join(self.backup_dir, name))
+            )
+        else:
+            platforms = []
+
+        paths = []
+        for name in platforms:
+            for path in sorted(glob.glob(os.path.join(self.backup_dir, name, '*.jsonl.gz'))):
+                day = os.path.basename(path)[:10]
+                if (since_day and day < since_day) or (until_day and day > until_day):
+                    continue
+                paths.append(path)
+        return paths
+
+    def read_items(self, platform=None, username=None, since=None, until=None):
+        """按平台、账号和收集时间范围逐条读取备份，不会整体加载到内存
+
+        since/until为datetime/date或ISO格式字符串，闭区间。
+        """
+        since = to_iso(since)
+        until = to_iso(until)
+        if isinstance(until, str) and len(until) == 10:
+            # 只给日期时包含当天全天
+            until = f"{until}T23:59:59.999999"
+        # 先做子串匹配，只对可能命中的行解析JSON
+        needle = f'"username": {json.dumps(username, ensure_ascii=False)}' if username else None
+
+        for path in self.partitions(platform, since, until):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if needle and needle not in line:
+                        continue
+                    item = json.loads(line)
+                    if username and item.get("username") != username:
+                        continue
+                    collected_at = item.get("collected_at", "")
+                    if (since and collected_at < since) or (until and collected_at > until):
+                        continue
+                    yield item
+
+    def import_legacy_files(self, pattern=None):
+        """导入旧版每次运行一个的social_media_data_*.json备份文件，返回导入的条数"""
+        pattern = pattern or os.path.join(self.backup_dir, 'social_media_data_*.json')
+        count = 0
+        for path in sorted(glob.glob(pattern)):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    items = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"跳过无法读取的备份文件{path}: {str(e)}")
+                continue
+            self.write(items)
+            count += len(items)
+        self.flush()
+        return count
+
+def main():
+    parser = argparse.ArgumentParser(description='备份数据查询工具')
+    parser.add_argument('--backup-dir', default=BACKUP_DIR, help='备份目录')
+    parser.add_argument('--platform', help='按平台过滤')
+    parser.add_argument('--username', help='按账号过滤')
+    parser.add_argument('--since', help='起始收集时间(ISO格式)')
+    parser.add_argument('--until', help='截止收集时间(ISO格式)')
+    parser.add_argument('--count', action='store_true', help='只输出条数')
+    parser.add_argument('--import-legacy', action='store_true', help='导入旧版JSON备份文件')
+    args = parser.parse_args()
+
+    store = BackupStore(args.backup_dir)
+    if args.import_legacy:
+        print(f"已导入{store.import_legacy_files()}条内容")
+        return
+
+    items = store.read_items(args.platform, args.username, args.since, args.until)
+    if args.count:
+        print(sum(1 for _ in items))
+        return
+    for item in items:
+        sys.stdout.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+if __name__ == "__main__":
+    main()
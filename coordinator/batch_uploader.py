@@ -0,0 +1,123 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from http_client import backoff_delay, request_not_sent
+
+logger = logging.getLogger(__name__)
+
+# 飞书batch_create单次最多写入500条记录
+FEISHU_BATCH_SIZE = int(os.getenv('FEISHU_BATCH_SIZE', '500'))
+# 同时上传的分块数量
+FEISHU_UPLOAD_CONCURRENCY = int(os.getenv('FEISHU_UPLOAD_CONCURRENCY', '4'))
+# 单个分块失败后的重试次数，重试耗尽后对分拆块定位坏记录
+FEISHU_CHUNK_RETRIES = int(os.getenv('FEISHU_CHUNK_RETRIES', '2'))
+
+class OutcomeUnknown(Exception):
+    """分块请求已经发出但无法确认是否写入(如feishu-mcp到飞书的连接中途断开)"""
+
+class Chunk:
+    """一个待上传的分块，offset为首条记录在原始列表中的位置"""
+
+    def __init__(self, chunk_id, offset, records, attempts=0):
+        self.chunk_id = chunk_id
+        self.offset = offset
+        self.records = records
+        self.attempts = attempts
+
+    def split(self):
+        """对半拆分，多条记录的子块失败后直接继续拆分，单条记录的子块重新获得重试次数"""
+        middle = len(self.records) // 2
+        parts = [(self.offset, self.records[:middle]), (self.offset + middle, self.records[middle:])]
+        return [
+            Chunk(f"{self.chunk_id}.{number}", offset, records, self.attempts if len(records) > 1 else 0)
+            for number, (offset, records) in enumerate(parts, 1)
+        ]
+
+def upload_in_chunks(records, send_chunk, batch_size=None, concurrency=None, max_retries=None, idempotent=True):
+    """分块并行上传记录
+
+    send_chunk(records)返回True表示该分块写入成功。失败的分块会单独重试，
+    重试耗尽后对半拆分继续上传，使单条坏记录只影响自身。
+
+    非幂等的send_chunk(追加记录)设置idempotent=False：读超时或连接在请求发出后断开时
+    服务端可能已经写入，该分块记为结果未知的失败，不再重试或拆分，以免重复写入。
+    send_chunk抛出OutcomeUnknown时同样处理。
+
+    返回上传报告：{"total", "sent", "failed", "chunks", "succeeded", "unknown"}，
+    其中succeeded为写入成功的记录在原始列表中的下标，unknown为结果未知的记录下标。
+    """
+    batch_size = batch_size or FEISHU_BATCH_SIZE
+    concurrency = concurrency or FEISHU_UPLOAD_CONCURRENCY
+    max_retries = FEISHU_CHUNK_RETRIES if max_retries is None else max_retries
+
+    pending = [
+        Chunk(str(number + 1), start, records[start:start + batch_size])
+        for number, start in enumerate(range(0, len(records), batch_size))
+    ]
+    report = {"total": len(records), "sent": 0, "failed": 0, "chunks": [], "succeeded": [], "unknown": []}
+    round_number = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while pending:
+            if round_number:
+                time.sleep(backoff_delay(min(round_number - 1, max_retries)))
+            round_number += 1
+
+            futures = {executor.submit(send_chunk, chunk.records): chunk for chunk in pending}
+            pending = []
+            for future in as_completed(futures):
+                chunk = futures[future]
+                chunk.attempts += 1
+                unknown = False
+                try:
+                    success = bool(future.result())
+                except OutcomeUnknown as e:
+                    logger.error(f"上传分块{chunk.chunk_id}结果未知: {str(e)}")
+                    success = False
+                    unknown = True
+                except (requests.Timeout, requests.ConnectionError) as e:
+                    logger.error(f"上传分块{chunk.chunk_id}出错: {str(e)}")
+                    success = False
+                    unknown = not idempotent and not request_not_sent(e)
+                except Exception as e:
+                    logger.error(f"上传分块{chunk.chunk_id}出错: {str(e)}")
+                    success = False
+
+                if success:
+                    logger.info(f"分块{chunk.chunk_id}上传成功: {len(chunk.records)}条")
+                    report["sent"] += len(chunk.records)
+                    report["succeeded"].extend(range(chunk.offset, chunk.offset + len(chunk.records)))
+                elif unknown:
+                    logger.error(f"分块{chunk.chunk_id}无法确认是否已写入，不再重试: "
+                                 f"{len(chunk.records)}条")
+                    report["failed"] += len(chunk.records)
+                    report["unknown"].extend(range(chunk.offset, chunk.offset + len(chunk.records)))
+                elif chunk.attempts <= max_retries:
+                    logger.warning(f"分块{chunk.chunk_id}上传失败，准备第{chunk.attempts}次重试")
+                    pending.append(chunk)
+                    continue
+                elif len(chunk.records) > 1:
+                    logger.warning(f"分块{chunk.chunk_id}重试耗尽，拆分为更小的分块继续上传")
+                    pending.extend(chunk.split())
+                    continue
+                else:
+                    logger.error(f"分块{chunk.chunk_id}上传失败，放弃记录: {chunk.records[0]}")
+                    report["failed"] += len(chunk.records)
+
+                report["chunks"].append({
+                    "chunk": chunk.chunk_id,
+                    "size": len(chunk.records),
+                    "success": success,
+                    "attempts": chunk.attempts,
+                    "unknown": unknown
+                })
+
+    report["succeeded"].sort()
+    report["unknown"].sort()
+    logger.info(f"飞书上传完成: 成功{report['sent']}条，失败{report['failed']}条，"
+                f"共{len(report['chunks'])}个分块")
+    return report
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+from html_parser import BACKENDS, available_backends, get_backend
+from mock_data import generate_mock_twitter_html, generate_mock_xiaohongshu_html
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 与当前时间相关、不参与结果一致性比较的字段
+VOLATILE_FIELDS = ("collected_at", "timestamp")
+
+def get_extractor(platform):
+    """按平台返回提取函数，延迟导入scraper以免基准测试初始化日志文件"""
+    import scraper
+    return {
+        "twitter": scraper.extract_tweets,
+        "xiaohongshu": scraper.extract_xiaohongshu_notes
+    }[platform]
+
+def generate_fixtures(directory=FIXTURES_DIR, count=40, seed=42):
+    """生成固定随机种子的HTML样本页面"""
+    random.seed(seed)
+    os.makedirs(directory, exist_ok=True)
+    pages = {
+        "twitter_profile.html": generate_mock_twitter_html("OpenAI", count),
+        "xiaohongshu_profile.html": generate_mock_xiaohongshu_html("AI博主", count)
+    }
+    for filename, content in pages.items():
+        with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+            f.write(content)
+    print(f"已生成{len(pages)}个HTML样本到 {directory}")
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """加载HTML样本，文件名前缀(twitter_/xiaohongshu_)决定所属平台"""
+    fixtures = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".html"):
+            continue
+        platform = filename.split("_", 1)[0]
+        if platform not in ("twitter", "xiaohongshu"):
+            continue
+        with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+            fixtures.append((filename, platform, f.read()))
+    return fixtures
+
+def stable_fields(items):
+    return [{k: v for k, v in item.items() if k not in VOLATILE_FIELDS} for item in items]
+
+def bench_backend(backend, extract, html_content, iterations):
+    """返回单页平均耗时(毫秒)和提取结果"""
+    items = extract(html_content, "bench", backend)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        extract(html_content, "bench", backend)
+    elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1000, items
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML解析后端基准测试')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='HTML样本目录')
+    parser.add_argument('--iterations', type=int, default=50, help='每个样本的解析次数')
+    parser.add_argument('--generate', action='store_true', help='重新生成HTML样本')
+    args = parser.parse_args()
+
+    if args.generate or not os.path.isdir(args.fixtures):
+        generate_fixtures(args.fixtures)
+
+    backends = available_backends()
+    missing = [name for name in BACKENDS if name not in backends]
+    if missing:
+        print(f"未安装的后端: {', '.join(missing)}")
+
+    identical = True
+    for filename, platform, html_content in load_fixtures(args.fixtures):
+        extract = get_extractor(platform)
+        print(f"\n{filename} ({len(html_content) / 1024:.1f} KB)")
+
+        baseline_ms, baseline_items = bench_backend(get_backend('html.parser'), extract, html_content, args.iterations)
+        for name in backends:
+            elapsed_ms, items = bench_backend(get_backend(name), extract, html_content, args.iterations)
+            same = stable_fields(items) == stable_fields(baseline_items)
+            identical = identical and same
+            print(f"  {name:<12} {elapsed_ms:8.2f} ms/页  {baseline_ms / elapsed_ms:5.1f}x  "
+                  f"{len(items)}条  {'结果一致' if same else '结果不一致'}")
+
+    return 0 if identical else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
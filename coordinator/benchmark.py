@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+import glob
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from mock_data import (
+    generate_mock_twitter_data, generate_mock_xiaohongshu_data,
+    generate_mock_twitter_html, generate_mock_xiaohongshu_html, format_mock_stat
+)
+from mock_servers import start_mock_servers
+from html_parser import available_backends, get_backend
+from extract_pool import ExtractPool, pool_size
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results')
+
+def prepare_state_dir():
+    """创建独立的状态目录并放开限速，须在导入协调器模块之前调用
+
+    不放在模块级：解析进程池以spawn方式启动时，工作进程会重新导入__main__，
+    模块级的mkdtemp会为每个工作进程多留下一个目录。
+    """
+    state_dir = tempfile.mkdtemp(prefix='coordinator_bench_')
+    os.environ.setdefault('SEEN_INDEX_PATH', os.path.join(state_dir, 'seen_posts.db'))
+    os.environ.setdefault('ENGAGEMENT_DB_PATH', os.path.join(state_dir, 'engagement.db'))
+    os.environ.setdefault('TOOL_CACHE_PATH', os.path.join(state_dir, 'scrape_tool.json'))
+    os.environ.setdefault('BACKUP_DIR', os.path.join(state_dir, 'backup'))
+    os.environ.setdefault('RATE_LIMIT_DEFAULT', '100000')
+    os.environ.setdefault('RATE_LIMIT_BURST', '100000')
+    return state_dir
+
+def generate_items(count):
+    """按1:1比例生成Twitter和小红书模拟内容"""
+    items = []
+    accounts = max(1, count // 20)
+    for index in range(accounts):
+        items.extend(generate_mock_twitter_data(f"twitter_{index}", count=10))
+        items.extend(generate_mock_xiaohongshu_data(f"xhs_{index}", count=10))
+    return items[:count]
+
+def measure(func, units, memory=True):
+    """运行一个阶段，返回耗时、吞吐量和峰值内存
+
+    先不开tracemalloc计时，再单独跑一遍测峰值内存，避免追踪开销影响计时。
+    """
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    result = {"seconds": round(seconds, 4), "items": units, "items_per_sec": round(units / seconds, 1) if seconds else None}
+
+    if memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_mb"] = round(peak / 1024 / 1024, 2)
+    return result
+
+def run_benchmarks(item_count, accounts, state_dir, memory=True, latency_ms=0):
+    import scraper
+    from seen_index import SeenIndex
+    from backup_store import BackupStore
+    from pipeline import Pipeline
+
+    # 协调器在导入时配置了INFO级别日志，测量时只保留警告
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"生成{item_count}条模拟内容...")
+    items = generate_items(item_count)
+    stats_text = [format_mock_stat(random.randint(0, 5000000), chinese=i % 2 == 0) for i in range(item_count)]
+    pages = []
+    for index in range(max(25, item_count // 400)):
+        pages.append(('twitter', generate_mock_twitter_html(f"t{index}", 10)))
+        pages.append(('xiaohongshu', generate_mock_xiaohongshu_html(f"x{index}", 10)))
+
+    results = {}
+
+    def run(name, func, units):
+        print(f"  {name}...", end='', flush=True)
+        results[name] = measure(func, units, memory)
+        print(f" {results[name]['items_per_sec']} 条/秒")
+
+    run("convert_stat_to_number", lambda: [scraper.convert_stat_to_number(text) for text in stats_text], len(stats_text))
+
+    extractors = {
+        'twitter': scraper.extract_tweets,
+        'xiaohongshu': scraper.extract_xiaohongshu_notes
+    }
+    for name in available_backends():
+        backend = get_backend(name)
+        run(f"extract[{name}]",
+            lambda backend=backend: [extractors[platform](page, "bench", backend) for platform, page in pages],
+            len(pages))
+
+    # 多进程解析：抓取线程把页面提交给进程池
+    workers = pool_size()
+    if workers > 1:
+        pool = ExtractPool(workers)
+        pool.extract('twitter', pages[0][1], "bench")  # 预先启动工作进程
+        def pool_stage():
+            with ThreadPoolExecutor(max_workers=workers * 2) as executor:
+                list(executor.map(lambda page: pool.extract(page[0], page[1], "bench"), pages))
+        run(f"extract[process_pool x{workers}]", pool_stage, len(pages))
+        pool.shutdown()
+
+    run("format_for_feishu", lambda: scraper.format_for_feishu(items), len(items))
+
+    def seen_index_stage():
+        path = os.path.join(state_dir, f"seen_{time.monotonic_ns()}.db")
+        index = SeenIndex(path)
+        new_items, changed_items = index.classify(items)
+        index.mark(new_items + changed_items)
+        index.classify(items)
+        index.close()
+    run("seen_index", seen_index_stage, len(items))
+
+    def backup_stage():
+        store = BackupStore(os.path.join(state_dir, f"backup_{time.monotonic_ns()}"))
+        for start in range(0, len(items), 500):
+            store.write(items[start:start + 500])
+        store.close()
+    run("backup_write", backup_stage, len(items))
+
+    # 端到端：本地模拟服务 → 并发抓取 → 管道 → 飞书上传
+    scraper_server, feishu_server = start_mock_servers(scraper_options={"latency_ms": latency_ms})
+    scraper.WEB_SCRAPER_MCP_URL = f"http://{scraper_server.server_address[0]}:{scraper_server.server_address[1]}"
+    scraper.FEISHU_MCP_URL = f"http://{feishu_server.server_address[0]}:{feishu_server.server_address[1]}"
+    target_accounts = {
+        'twitter': [f"bench_t{i}" for i in range(accounts // 2)],
+        'xiaohongshu': [f"bench_x{i}" for i in range(accounts - accounts // 2)]
+    }
+    # 预先生成页面，只测量协调器自身
+    for platform, usernames in target_accounts.items():
+        for username in usernames:
+            scraper_server.render_page(platform, username)
+
+    def end_to_end():
+        feishu_server.records = 0
+        scrape_tool = scraper.discover_scrape_tool()
+        pipeline = Pipeline(format_records=scraper.format_for_feishu, send_records=scraper.send_to_feishu)
+        pipeline.run(scraper.scrape_accounts(target_accounts, scrape_tool))
+    run("end_to_end[accounts]", end_to_end, accounts)
+    results["end_to_end[accounts]"]["records_sent"] = feishu_server.records
+    scraper_server.shutdown()
+    feishu_server.shutdown()
+
+    return results
+
+def current_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def save_results(results, item_count, accounts):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    commit = current_commit()
+    payload = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "items": item_count,
+        "accounts": accounts,
+        "python": sys.version.split()[0],
+        "stages": results
+    }
+    path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    return path
+
+def compare_results(current_path, baseline_path):
+    """对比两次结果的吞吐量，变慢超过10%的阶段标记为回退"""
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\n对比基准 {baseline['commit']} ({baseline['timestamp']}) → {current['commit']}")
+    regressions = 0
+    for name, stage in current["stages"].items():
+        before = baseline["stages"].get(name)
+        if not before or not before.get("items_per_sec") or not stage.get("items_per_sec"):
+            print(f"  {name:<28} 无可对比数据")
+            continue
+        change = stage["items_per_sec"] / before["items_per_sec"] - 1
+        flag = "  回退" if change < -0.1 else ""
+        regressions += bool(flag)
+        print(f"  {name:<28} {before['items_per_sec']:>12} → {stage['items_per_sec']:>12} 条/秒 ({change:+.1%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='协调器流水线基准测试')
+    parser.add_argument('--items', type=int, default=10000, help='模拟内容条数(1万~100万)')
+    parser.add_argument('--accounts', type=int, default=200, help='端到端测试的账号数')
+    parser.add_argument('--latency-ms', type=float, default=0, help='端到端测试中模拟抓取服务的延迟')
+    parser.add_argument('--no-memory', action='store_true', help='不测量峰值内存(省去第二遍运行)')
+    parser.add_argument('--compare', nargs='?', const='latest', help='与指定结果文件(默认上一次结果)对比')
+    args = parser.parse_args()
+
+    previous = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    state_dir = prepare_state_dir()
+    try:
+        results = run_benchmarks(args.items, args.accounts, state_dir,
+                                 memory=not args.no_memory, latency_ms=args.latency_ms)
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    path = save_results(results, args.items, args.accounts)
+    print(f"\n结果已保存到 {path}")
+    for name, stage in results.items():
+        memory = f"  峰值{stage['peak_mb']}MB" if 'peak_mb' in stage else ""
+        print(f"  {name:<28} {stage['seconds']:>9}秒  {stage['items_per_sec']:>12} 条/秒{memory}")
+
+    if args.compare:
+        baseline = previous[-1] if args.compare == 'latest' and previous else args.compare
+        if baseline == 'latest':
+            print("\n没有可对比的历史结果")
+            return 0
+        return 1 if compare_results(path, baseline) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import os
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 内容分类配置文件，格式见content_types.json
+CONTENT_TYPES_FILE = os.getenv(
+    'CONTENT_TYPES_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content_types.json')
+)
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+def build_trie_pattern(keywords):
+    """将关键词编译为前缀树结构的正则表达式
+
+    相同前缀的关键词共享分支，每个位置只需沿一条路径匹配，
+    匹配代价与关键词数量无关；可选分组是贪婪的，总是返回该位置最长的关键词。
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in node.items() if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return re.compile(f'(?=({build(trie)}))')
+
+class KeywordClassifier:
+    """多类别关键词分类器，一次扫描内容即可得到全部匹配的类别"""
+
+    def __init__(self, categories, default='其他'):
+        self.names = [category['name'] for category in categories]
+        self.default = default
+
+        # 关键词 -> 所属类别下标集合
+        keyword_categories = {}
+        for index, category in enumerate(categories):
+            for keyword in category.get('keywords', []):
+                keyword = keyword.lower()
+                if keyword:
+                    keyword_categories.setdefault(keyword, set()).add(index)
+
+        if ahocorasick is not None:
+            self._keywords = keyword_categories
+            self._automaton = ahocorasick.Automaton()
+            for keyword, indexes in keyword_categories.items():
+                self._automaton.add_word(keyword, frozenset(indexes))
+            if keyword_categories:
+                self._automaton.make_automaton()
+            else:
+                self._automaton = None
+            return
+
+        # 正则每个位置只报告最长的关键词，因此把作为其前缀的关键词的类别也并入
+        self._automaton = None
+        self._keywords = {}
+        for keyword, indexes in keyword_categories.items():
+            merged = set(indexes)
+            for length in range(1, len(keyword)):
+                merged |= keyword_categories.get(keyword[:length], set())
+            self._keywords[keyword] = frozenset(merged)
+        self._pattern = build_trie_pattern(self._keywords) if self._keywords else None
+
+    def _matches(self, content):
+        if self._automaton is not None:
+            for _, indexes in self._automaton.iter(content):
+                yield indexes
+        elif self._pattern is not None:
+            for match in self._pattern.finditer(content):
+                yield self._keywords[match.group(1)]
+
+    def classify(self, content):
+        """返回内容所属的类别列表，按配置顺序排列，未匹配时返回默认类别"""
+        found = set()
+        for indexes in self._matches(content.lower()):
+            found |= indexes
+            if len(found) == len(self.names):
+                break
+        if not found:
+            return [self.default]
+        return [self.names[index] for index in sorted(found)]
+
+def load_classifier(path=CONTENT_TYPES_FILE):
+    """从配置文件加载分类器"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        logger.error(f"内容分类配置文件不存在: {path}")
+        config = {}
+    except json.JSONDecodeError:
+        logger.error(f"内容分类配置文件格式无效: {path}")
+        config = {}
+
+    classifier = KeywordClassifier(config.get('categories', []), config.get('default', '其他'))
+    logger.info(f"已加载{len(classifier.names)}个内容类别")
+    return classifier
+
+_classifier = None
+
+def classify_content(content):
+    """使用默认配置文件对内容分类"""
+    global _classifier
+    if _classifier is None:
+        _classifier = load_classifier()
+    return _classifier.classify(content)
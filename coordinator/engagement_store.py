@@ -0,0 +1,182 @@
+import os
+import time
+import logging
+import argparse
+import threading
+
+from seen_index import post_fingerprint
+from sqlite_store import connect, select_in
+from platforms import get_platform
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+ENGAGEMENT_DB_PATH = os.getenv('ENGAGEMENT_DB_PATH', 'coordinator/state/engagement.db')
+# 互动数据样本保留天数
+ENGAGEMENT_RETENTION_DAYS = int(os.getenv('ENGAGEMENT_RETENTION_DAYS', '30'))
+# 是否为发送到飞书的记录计算互动增长(需要多维表格中有对应的字段)
+FEISHU_ENGAGEMENT_DELTAS = os.getenv('FEISHU_ENGAGEMENT_DELTAS', '').lower() in ('1', 'true', 'yes')
+
+DELTA_WINDOW_HOURS = 24
+
+def engagement_counts(item):
+    """将各平台的互动字段映射为(点赞, 评论, 转发)"""
+    plugin = get_platform(item.get("platform"))
+    if plugin is not None:
+        return plugin.engagement(item)
+    return item.get("likes", 0), item.get("comments", 0), item.get("shares", 0)
+
+def group_deltas(ids, ts, totals):
+    """按帖子分组计算窗口内的互动增长
+
+    输入按(帖子, 时间)排序的样本数组，返回每组的帖子下标、增长量、每小时增速和增长率。
+    """
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)] - 1
+    growth = totals[ends] - totals[starts]
+    hours = (ts[ends] - ts[starts]) / 3600.0
+    velocity = np.divide(growth, hours, out=np.zeros_like(growth, dtype=float), where=hours > 0)
+    rate = growth / np.maximum(totals[starts], 1)
+    return ids[starts], growth, velocity, rate
+
+class EngagementStore:
+    """帖子互动数据的时间序列
+
+    每次抓取为每个帖子追加一个样本，增长量、增速和涨幅榜都从
+    按(帖子, 时间)排序读出的数组批量计算，不逐条记录循环。
+    """
+
+    def __init__(self, path=ENGAGEMENT_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            "post_key BLOB NOT NULL, "
+            "ts REAL NOT NULL, "
+            "platform TEXT NOT NULL, "
+            "username TEXT NOT NULL, "
+            "likes INTEGER NOT NULL, "
+            "comments INTEGER NOT NULL, "
+            "shares INTEGER NOT NULL, "
+            "total INTEGER NOT NULL, "
+            "PRIMARY KEY (post_key, ts)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS samples_account ON samples (username, ts)")
+        self._conn.execute(
+            "DELETE FROM samples WHERE ts < ?", (time.time() - ENGAGEMENT_RETENTION_DAYS * 86400,)
+        )
+        self._conn.commit()
+
+    def record(self, items, ts=None):
+        """追加一批互动数据样本"""
+        ts = time.time() if ts is None else ts
+        rows = []
+        for item in items:
+            likes, comments, shares = engagement_counts(item)
+            rows.append((
+                post_fingerprint(item), ts, item.get("platform", ""), item.get("username", ""),
+                likes, comments, shares, likes + comments + shares
+            ))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def deltas(self, keys, hours=DELTA_WINDOW_HOURS, now=None):
+        """批量计算帖子在窗口内的互动增长，返回{指纹: (增长量, 每小时增速)}"""
+        if np is None or not keys:
+            return {}
+        since = (time.time() if now is None else now) - hours * 3600
+        keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            rows = list(select_in(
+                self._conn,
+                "SELECT post_key, ts, total FROM samples "
+                "WHERE post_key IN ({placeholders}) AND ts >= ? ORDER BY post_key, ts",
+                keys, (since,)
+            ))
+        if not rows:
+            return {}
+
+        index = {key: i for i, key in enumerate(keys)}
+        ids = np.fromiter((index[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+        ts = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        totals = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+        # 各批次的查询结果分别有序，合并后重新按(帖子, 时间)排序
+        order = np.lexsort((ts, ids))
+        group_ids, growth, velocity, _ = group_deltas(ids[order], ts[order], totals[order])
+        return {keys[i]: (int(g), float(v)) for i, g, v in zip(group_ids, growth, velocity)}
+
+    def annotate(self, items):
+        """为内容附加24小时互动增长字段，供format_for_feishu使用"""
+        if not FEISHU_ENGAGEMENT_DELTAS or not items:
+            return
+        if np is None:
+            logger.warning("未安装numpy，跳过互动增长计算")
+            return
+        keyed = [(post_fingerprint(item), item) for item in items]
+        deltas = self.deltas([key for key, _ in keyed])
+        for key, item in keyed:
+            growth, velocity = deltas.get(key, (0, 0.0))
+            item["engagement_growth_24h"] = growth
+            item["engagement_velocity_24h"] = round(velocity, 2)
+
+    def top_movers(self, username=None, hours=DELTA_WINDOW_HOURS, limit=10, now=None):
+        """窗口内互动增长最多的帖子，可按账号过滤"""
+        if np is None:
+            raise RuntimeError("计算涨幅榜需要安装numpy")
+        since = (time.time() if now is None else now) - hours * 3600
+        query = "SELECT post_key, ts, total, platform, username FROM samples WHERE ts >= ?"
+        params = [since]
+        if username:
+            query += " AND username = ?"
+            params.append(username)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY post_key, ts", params).fetchall()
+        if not rows:
+            return []
+
+        keys = {}
+        ids = np.fromiter((keys.setdefault(row[0], len(keys)) for row in rows), dtype=np.int64, count=len(rows))
+        ts = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        totals = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+        group_ids, growth, velocity, rate = group_deltas(ids, ts, totals)
+
+        # 每个帖子最后一条样本的下标，用于取平台和账号
+        last_rows = np.r_[np.flatnonzero(ids[1:] != ids[:-1]), len(ids) - 1]
+        top = np.argsort(-growth, kind='stable')[:limit]
+        key_list = list(keys)
+        return [{
+            "post_key": key_list[group_ids[i]].hex(),
+            "platform": rows[last_rows[i]][3],
+            "username": rows[last_rows[i]][4],
+            "total": int(totals[last_rows[i]]),
+            "growth": int(growth[i]),
+            "velocity": round(float(velocity[i]), 2),
+            "growth_rate": round(float(rate[i]), 4)
+        } for i in top]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='互动数据涨幅榜')
+    parser.add_argument('--username', help='只看某个账号')
+    parser.add_argument('--hours', type=float, default=DELTA_WINDOW_HOURS, help='统计窗口(小时)')
+    parser.add_argument('--limit', type=int, default=10, help='输出条数')
+    args = parser.parse_args()
+
+    store = EngagementStore()
+    for mover in store.top_movers(args.username, args.hours, args.limit):
+        print(f"{mover['platform']:<12} {mover['username']:<20} 增长{mover['growth']:>8}  "
+              f"{mover['velocity']:>8}/小时  涨幅{mover['growth_rate']:.1%}  当前{mover['total']}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from platforms import get_platform
+
+logger = logging.getLogger(__name__)
+
+# 解析页面的工作进程数，auto为CPU核数，0或1表示在抓取线程中直接解析
+EXTRACT_WORKERS = os.getenv('EXTRACT_WORKERS', 'auto')
+# 账号数少于该值时不使用进程池(进程启动和传输HTML的开销大于并行收益)
+EXTRACT_POOL_MIN_ACCOUNTS = int(os.getenv('EXTRACT_POOL_MIN_ACCOUNTS', '16'))
+
+def pool_size(value=None):
+    value = EXTRACT_WORKERS if value is None else value
+    if str(value).lower() == 'auto':
+        return os.cpu_count() or 1
+    try:
+        return max(0, int(value))
+    except ValueError:
+        logger.warning(f"无效的解析进程数配置: {value}")
+        return 0
+
+def extract_compact(platform, html_content, username, limit=10):
+    """在工作进程中解析页面，返回(字段名, 行元组列表)
+
+    同一页面的内容字段相同，只传一次字段名，比逐条pickle字典更紧凑。
+    """
+    items = get_platform(platform).extract(html_content, username, limit=limit)
+    if not items:
+        return (), []
+    keys = tuple(items[0])
+    return keys, [tuple(item.get(key) for key in keys) for item in items]
+
+def expand(keys, rows):
+    return [dict(zip(keys, row)) for row in rows]
+
+class ExtractPool:
+    """把HTML解析分发到多个工作进程，绕开GIL
+
+    抓取线程提交页面后等待结果，等待期间不占用GIL，其他线程可以继续收发请求。
+    进程池在首次使用时创建并跨周期复用；进程池损坏时退回到进程内解析。
+    """
+
+    def __init__(self, workers=None):
+        self.workers = pool_size() if workers is None else workers
+        self._executor = None
+        self._broken = False
+        self._lock = threading.Lock()
+
+    def enabled_for(self, account_count):
+        """账号足够多时才值得使用进程池"""
+        return self.workers > 1 and not self._broken and account_count >= EXTRACT_POOL_MIN_ACCOUNTS
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None and not self._broken:
+                # 进程池创建时抓取、发送线程已在运行，fork会复制其他线程持有的锁，
+                # 用spawn启动干净的工作进程
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                logger.info(f"已启动{self.workers}个解析进程")
+            return self._executor
+
+    def extract(self, platform, html_content, username, limit=10):
+        executor = self._get_executor()
+        if executor is not None:
+            try:
+                return expand(*executor.submit(extract_compact, platform, html_content, username, limit).result())
+            except BrokenProcessPool as e:
+                logger.error(f"解析进程池异常，改为在进程内解析: {str(e)}")
+                with self._lock:
+                    self._broken = True
+                    self._executor = None
+        return get_platform(platform).extract(html_content, username, limit=limit)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+# 进程内共享的解析进程池
+extract_pool = ExtractPool()
@@ -0,0 +1,424 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+
+import http_client
+from batch_uploader import upload_in_chunks
+from metrics import metrics
+from sqlite_store import connect, select_in
+
+logger = logging.getLogger(__name__)
+
+# 飞书开放平台配置(应用凭证在使用时读取，协调器在导入模块之后才加载.env)
+FEISHU_API_BASE = os.getenv('FEISHU_API_BASE', 'https://open.feishu.cn/open-apis')
+
+# tenant_access_token的磁盘缓存，重启后在有效期内继续使用
+FEISHU_TOKEN_CACHE_PATH = os.getenv('FEISHU_TOKEN_CACHE_PATH', 'coordinator/state/feishu_token.json')
+# 距离过期不足该秒数时在后台提前刷新(令牌有效期约2小时)
+FEISHU_TOKEN_REFRESH_AHEAD = float(os.getenv('FEISHU_TOKEN_REFRESH_AHEAD', '300'))
+
+# 令牌无效或过期的错误码，收到后丢弃缓存重新获取
+TOKEN_INVALID_CODES = {99991661, 99991663, 99991668}
+# 记录已在多维表格中被删除
+RECORD_NOT_FOUND_CODES = {1254043}
+
+# 帖子指纹 → 多维表格record_id的本地映射，用于更新已写入的记录
+FEISHU_RECORD_MAP_PATH = os.getenv('FEISHU_RECORD_MAP_PATH', 'coordinator/state/feishu_records.db')
+# 更新已有记录时不覆盖的字段(人工维护的字段)，逗号分隔
+FEISHU_UPDATE_PRESERVE_FIELDS = [
+    field.strip() for field in os.getenv('FEISHU_UPDATE_PRESERVE_FIELDS', '敏感度').split(',') if field.strip()
+]
+
+def empty_report():
+    return {"total": 0, "sent": 0, "failed": 0, "chunks": [], "succeeded": [], "unknown": []}
+
+class FeishuError(Exception):
+    """飞书接口返回非0错误码"""
+
+    def __init__(self, code, message):
+        super().__init__(f"飞书接口错误{code}: {message}")
+        self.code = code
+
+class TenantTokenCache:
+    """tenant_access_token的内存 + 磁盘缓存
+
+    并发的上传线程共享同一个令牌；令牌缺失或已过期时只有一个线程去获取，其余线程等待结果。
+    后台线程在过期前FEISHU_TOKEN_REFRESH_AHEAD秒刷新，正常情况下写入请求不需要等待令牌。
+    """
+
+    def __init__(self, app_id=None, app_secret=None, path=FEISHU_TOKEN_CACHE_PATH,
+                 refresh_ahead=FEISHU_TOKEN_REFRESH_AHEAD):
+        self._app_id = app_id
+        self._app_secret = app_secret
+        self.path = path
+        self.refresh_ahead = refresh_ahead
+        self.token = None
+        self.expires_at = 0
+        self.stats = {"fetches": 0, "hits": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+        self._loaded = False
+
+    @property
+    def app_id(self):
+        return os.getenv('FEISHU_APP_ID', '') if self._app_id is None else self._app_id
+
+    @property
+    def app_secret(self):
+        return os.getenv('FEISHU_APP_SECRET', '') if self._app_secret is None else self._app_secret
+
+    def _load(self):
+        """首次使用时读取磁盘缓存，调用方持有锁"""
+        self._loaded = True
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"飞书令牌缓存文件无效: {str(e)}")
+            return
+        # 换了应用后旧令牌不可用
+        if entry.get("app_id") == self.app_id and entry.get("expires_at", 0) > time.time():
+            self.token = entry.get("token")
+            self.expires_at = entry["expires_at"]
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            # 令牌可以直接调用接口，只允许本用户读取
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"app_id": self.app_id, "token": self.token, "expires_at": self.expires_at}, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存飞书令牌缓存失败: {str(e)}")
+
+    def _fetch(self):
+        """向飞书获取新令牌，调用方持有锁"""
+        response = http_client.post(
+            FEISHU_API_BASE,
+            "/auth/v3/tenant_access_token/internal",
+            json={"app_id": self.app_id, "app_secret": self.app_secret}
+        )
+        data = response.json()
+        if data.get("code", 0) != 0:
+            raise FeishuError(data.get("code"), data.get("msg", "获取令牌失败"))
+        self.token = data["tenant_access_token"]
+        self.expires_at = time.time() + data.get("expire", 7200)
+        self.stats["fetches"] += 1
+        self._save()
+        logger.info(f"已获取飞书tenant_access_token，{data.get('expire', 7200)}秒后过期")
+        return self.token
+
+    def _needs_refresh(self, now):
+        return self.token is None or now >= self.expires_at - self.refresh_ahead
+
+    def get(self):
+        """返回有效的令牌，缓存中没有或已过期时同步获取"""
+        token = self.token
+        if token is not None and time.time() < self.expires_at - self.refresh_ahead:
+            self.stats["hits"] += 1
+            return token
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            now = time.time()
+            if not self._needs_refresh(now):
+                # 等锁期间其他线程已经获取
+                self.stats["hits"] += 1
+                return self.token
+            try:
+                return self._fetch()
+            except Exception:
+                # 刷新失败但令牌尚未真正过期时继续使用
+                if self.token is not None and now < self.expires_at:
+                    logger.warning("提前刷新飞书令牌失败，继续使用当前令牌")
+                    return self.token
+                raise
+
+    def invalidate(self, token=None):
+        """丢弃缓存的令牌(飞书返回令牌无效时调用)，token不是当前令牌时说明已被其他线程刷新"""
+        with self._lock:
+            if token is None or token == self.token:
+                self.token = None
+                self.expires_at = 0
+
+    def start(self):
+        """启动后台刷新线程"""
+        if self._refresher is None:
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        failures = 0
+        while True:
+            if failures:
+                wait_seconds = http_client.backoff_delay(failures)
+            else:
+                wait_seconds = max(1.0, self.expires_at - self.refresh_ahead - time.time()) if self.token else 0
+            if self._stop.wait(wait_seconds):
+                return
+            try:
+                with self._lock:
+                    if not self._loaded:
+                        self._load()
+                    if self._needs_refresh(time.time()):
+                        self._fetch()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.warning(f"后台刷新飞书令牌失败: {str(e)}")
+
+    def stop(self):
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+# 进程内共享的飞书令牌缓存
+token_cache = TenantTokenCache()
+
+def post(path, json=None, idempotent=True, cache=None):
+    """带tenant_access_token调用飞书开放平台接口，返回响应数据(code为0)
+
+    令牌被判定无效时丢弃缓存并重新获取，再重试一次。
+    """
+    cache = cache or token_cache
+    for attempt in range(2):
+        token = cache.get()
+        response = http_client.post(
+            FEISHU_API_BASE,
+            path,
+            json=json,
+            headers={"Authorization": f"Bearer {token}"},
+            idempotent=idempotent
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            raise FeishuError(response.status_code, f"HTTP {response.status_code}")
+        code = data.get("code", 0)
+        if code in TOKEN_INVALID_CODES and attempt == 0:
+            logger.warning(f"飞书令牌无效({code})，重新获取")
+            cache.invalidate(token)
+            continue
+        if code != 0:
+            raise FeishuError(code, data.get("msg", ""))
+        return data
+
+def chunk_client_token(keys, salt):
+    """按分块内容和本次创建的随机盐生成client_token
+
+    同一次创建的分块重试时token不变，飞书不会重复创建记录；记录被删除后
+    重新创建时换用新的盐，避免飞书按旧token返回已删除的record_id。
+    """
+    digest = hashlib.blake2b(salt + b''.join(keys), digest_size=16).digest()
+    return str(uuid.UUID(bytes=digest, version=4))
+
+class BitableClient:
+    """飞书多维表格记录接口，直接调用开放平台，不经过feishu-mcp"""
+
+    def __init__(self, app_token=None, table_id=None, cache=None):
+        self.app_token = app_token or os.getenv('FEISHU_BITABLE_ID', '')
+        self.table_id = table_id or os.getenv('FEISHU_TABLE_ID', '')
+        self.cache = cache
+
+    def _path(self, action):
+        return f"/bitable/v1/apps/{self.app_token}/tables/{self.table_id}/records/{action}"
+
+    def batch_create(self, records, client_token=None):
+        """批量创建记录(最多500条)，按请求顺序返回record_id列表"""
+        path = self._path('batch_create')
+        if client_token:
+            path += f"?client_token={client_token}"
+        # 带client_token时重复提交不会重复创建，可以安全重试
+        data = post(path, json={"records": records}, idempotent=bool(client_token), cache=self.cache)
+        return [record["record_id"] for record in data.get("data", {}).get("records", [])]
+
+    def batch_update(self, records):
+        """批量更新记录(最多500条)，records为[{"record_id": ..., "fields": {...}}]"""
+        post(self._path('batch_update'), json={"records": records}, cache=self.cache)
+
+class RecordMap:
+    """帖子指纹 → record_id，SQLite主键索引"""
+
+    def __init__(self, path=FEISHU_RECORD_MAP_PATH):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS record_ids ("
+            "key BLOB PRIMARY KEY, "
+            "record_id TEXT NOT NULL, "
+            "updated_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys):
+        with self._lock:
+            return dict(select_in(
+                self._conn, "SELECT key, record_id FROM record_ids WHERE key IN ({placeholders})", set(keys)
+            ))
+
+    def put_many(self, pairs):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO record_ids VALUES (?, ?, ?)",
+                                   [(key, record_id, now) for key, record_id in pairs])
+
+    def delete_many(self, keys):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM record_ids WHERE key = ?", [(key,) for key in keys])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class BitableWriter:
+    """直接写入多维表格并按帖子更新已有记录
+
+    本地记录过record_id的帖子用batch_update更新(互动数据变化时不再追加重复行)，
+    其余的用batch_create创建并保存返回的record_id。两类记录各自分块并行上传，
+    沿用upload_in_chunks的重试和拆分逻辑，返回与feishu-mcp写入相同格式的上传报告。
+    """
+
+    def __init__(self, client=None, record_map=None, preserve_fields=None):
+        self.client = client
+        self.record_map = record_map
+        self.preserve_fields = FEISHU_UPDATE_PRESERVE_FIELDS if preserve_fields is None else preserve_fields
+        self._lock = threading.Lock()
+
+    def _ensure_open(self):
+        # 首次写入时才创建客户端和映射文件(此时.env已加载)
+        with self._lock:
+            if self.client is None:
+                self.client = BitableClient()
+            if self.record_map is None:
+                self.record_map = RecordMap()
+
+    def send(self, records, keys):
+        """写入记录，keys为每条记录对应的帖子指纹"""
+        self._ensure_open()
+        known = self.record_map.get_many(keys)
+        creates = []
+        updates = []
+        for index, (key, record) in enumerate(zip(keys, records)):
+            record_id = known.get(key)
+            if record_id is None:
+                creates.append((index, key, record))
+            else:
+                updates.append((index, key, record, record_id))
+
+        # 本次创建(含更新时发现记录已删除而重新创建)共用一个盐，upload_in_chunks重试分块时client_token不变
+        salt = uuid.uuid4().bytes
+        report = empty_report()
+        report["total"] = len(records)
+        for entries, send_chunk in ((creates, lambda chunk: self._create_chunk(chunk, salt)),
+                                    (updates, lambda chunk: self._update_chunk(chunk, salt))):
+            if not entries:
+                continue
+            part = upload_in_chunks(entries, send_chunk)
+            report["sent"] += part["sent"]
+            report["failed"] += part["failed"]
+            report["chunks"].extend(part["chunks"])
+            report["succeeded"].extend(entries[i][0] for i in part["succeeded"])
+            report["unknown"].extend(entries[i][0] for i in part["unknown"])
+        report["succeeded"].sort()
+        report["unknown"].sort()
+        metrics.inc('records_created', len(creates))
+        metrics.inc('records_updated', len(updates))
+        logger.info(f"直接写入飞书: 新建{len(creates)}条，更新{len(updates)}条")
+        return report
+
+    def _create_chunk(self, entries, salt):
+        keys = [key for _, key, _ in entries]
+        with metrics.timer('send_chunk', mode='create'):
+            record_ids = self.client.batch_create([record for _, _, record in entries],
+                                                  chunk_client_token(keys, salt))
+        if len(record_ids) != len(entries):
+            logger.error(f"飞书返回的记录数({len(record_ids)})与提交数({len(entries)})不一致")
+            return False
+        self.record_map.put_many(zip(keys, record_ids))
+        return True
+
+    def _update_chunk(self, entries, salt):
+        updates = [
+            {"record_id": record_id,
+             "fields": {name: value for name, value in record["fields"].items() if name not in self.preserve_fields}}
+            for _, _, record, record_id in entries
+        ]
+        try:
+            with metrics.timer('send_chunk', mode='update'):
+                self.client.batch_update(updates)
+            return True
+        except FeishuError as e:
+            if e.code not in RECORD_NOT_FOUND_CODES:
+                raise
+        if len(entries) > 1:
+            # 整批更新因个别记录不存在而失败：对半拆分定位，其余记录照常更新
+            middle = len(entries) // 2
+            return all([self._update_chunk(entries[:middle], salt), self._update_chunk(entries[middle:], salt)])
+        # 表格中的记录已被删除：清除映射，改为重新创建
+        logger.warning(f"记录{entries[0][3]}在多维表格中已不存在，重新创建")
+        self.record_map.delete_many([entry[1] for entry in entries])
+        return self._create_chunk([entry[:3] for entry in entries], salt)
+
+    def record_ids(self, keys):
+        """已写入的帖子对应的record_id"""
+        self._ensure_open()
+        return self.record_map.get_many(keys)
+
+    def remember(self, pairs):
+        """导入其他实例写入的记录[(帖子指纹, record_id)]"""
+        self._ensure_open()
+        self.record_map.put_many(pairs)
+
+    def update_fields(self, fields_by_key):
+        """只更新已写入记录的指定字段，fields_by_key为{帖子指纹: 字段}
+
+        返回已处理的帖子指纹；记录已不在表格中的也算作已处理，尚未写入过的不在其中。
+        """
+        self._ensure_open()
+        known = self.record_map.get_many(fields_by_key)
+        entries = [(key, record_id, fields_by_key[key]) for key, record_id in known.items()]
+        if not entries:
+            return []
+        report = upload_in_chunks(entries, self._update_fields_chunk)
+        return [entries[i][0] for i in report["succeeded"]]
+
+    def _update_fields_chunk(self, entries):
+        try:
+            self.client.batch_update([{"record_id": record_id, "fields": fields} for _, record_id, fields in entries])
+            return True
+        except FeishuError as e:
+            if e.code not in RECORD_NOT_FOUND_CODES:
+                raise
+        if len(entries) > 1:
+            middle = len(entries) // 2
+            return all([self._update_fields_chunk(entries[:middle]), self._update_fields_chunk(entries[middle:])])
+        # 记录已被删除，没有可更新的字段
+        logger.warning(f"记录{entries[0][1]}在多维表格中已不存在，跳过更新")
+        return True
+
+    def close(self):
+        with self._lock:
+            if self.record_map is not None:
+                self.record_map.close()
+                self.record_map = None
+
+# 进程内共享的多维表格写入器
+bitable_writer = BitableWriter()
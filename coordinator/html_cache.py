@@ -0,0 +1,154 @@
+import os
+import gzip
+import time
+import hashlib
+import logging
+import threading
+
+from sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# 原始页面缓存目录(按内容哈希命名的gzip文件 + SQLite索引)
+HTML_CACHE_DIR = os.getenv('HTML_CACHE_DIR', 'coordinator/state/html_cache')
+# 缓存页面的总大小上限(MB，压缩后)，超出时按最近使用时间淘汰
+HTML_CACHE_MAX_MB = float(os.getenv('HTML_CACHE_MAX_MB', '200'))
+# 页面与上次抓取完全相同时跳过解析
+HTML_CACHE_ENABLED = os.getenv('HTML_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+def html_digest(html_content):
+    return hashlib.blake2b(html_content.encode('utf-8'), digest_size=16).hexdigest()
+
+class PageItems(list):
+    """从一个页面提取出的内容列表，page为(平台, 账号, 页面哈希, 提取器版本)
+
+    内容全部发送成功后再用page提交缓存记录(HtmlCache.commit)。
+    """
+
+    def __init__(self, items, page):
+        super().__init__(items)
+        self.page = page
+
+class HtmlCache:
+    """按内容寻址的原始页面缓存
+
+    记录每个账号上次成功发送的页面哈希和提取器版本，两者都相同时调用方可跳过解析；
+    最近的页面压缩保存在磁盘上(LRU淘汰)，修复提取器后可以重新解析。
+    账号记录只在页面的内容发送成功后提交(commit)，模拟模式、发送失败或进程中途退出时
+    下次抓取仍会解析该页面。
+    """
+
+    def __init__(self, directory=HTML_CACHE_DIR, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = int(HTML_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._conn = connect(os.path.join(directory, 'index.db'))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "digest TEXT PRIMARY KEY, "
+            "platform TEXT NOT NULL, "
+            "username TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "fetched_at REAL NOT NULL, "
+            "last_used REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            "platform TEXT NOT NULL, "
+            "username TEXT NOT NULL, "
+            "digest TEXT NOT NULL, "
+            "version TEXT NOT NULL, "
+            "PRIMARY KEY (platform, username)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def page_path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.html.gz")
+
+    def check(self, platform, username, html_content, version=''):
+        """保存账号本次抓取的页面，返回(页面和提取器版本是否与上次提交的相同, 页面哈希)"""
+        digest = html_digest(html_content)
+        version = str(version)
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT digest, version FROM accounts WHERE platform = ? AND username = ?", (platform, username)
+            ).fetchone()
+            if self._conn.execute("SELECT 1 FROM pages WHERE digest = ?", (digest,)).fetchone():
+                self._conn.execute("UPDATE pages SET last_used = ? WHERE digest = ?", (now, digest))
+            else:
+                size = self._write_page(digest, html_content)
+                self._conn.execute(
+                    "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?)", (digest, platform, username, size, now, now)
+                )
+                self._total_bytes += size
+            self._evict()
+            self._conn.commit()
+        return previous == (digest, version), digest
+
+    def commit(self, platform, username, digest, version=''):
+        """页面的内容已全部发送，记录为账号最新的页面，下次相同时跳过解析"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?)", (platform, username, digest, str(version))
+            )
+            self._conn.commit()
+
+    def commit_items(self, items):
+        """提交PageItems对应的页面，其他内容列表(回填、重新解析)忽略"""
+        page = getattr(items, 'page', None)
+        if page is not None:
+            self.commit(*page)
+
+    def _write_page(self, digest, html_content):
+        path = self.page_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, 'wb', compresslevel=6) as f:
+            f.write(html_content.encode('utf-8'))
+        os.replace(temp_path, path)
+        return os.path.getsize(path)
+
+    def _evict(self):
+        """超出大小上限时删除最久未使用的页面"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT digest, size FROM pages ORDER BY last_used").fetchall()
+        evicted = []
+        for digest, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self.page_path(digest))
+            except FileNotFoundError:
+                pass
+            evicted.append((digest,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM pages WHERE digest = ?", evicted)
+
+    def iter_pages(self, platform=None, username=None):
+        """按抓取时间顺序读取缓存的页面，产出(平台, 账号, HTML)"""
+        query = "SELECT digest, platform, username FROM pages WHERE 1 = 1"
+        params = []
+        if platform:
+            query += " AND platform = ?"
+            params.append(platform)
+        if username:
+            query += " AND username = ?"
+            params.append(username)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY fetched_at", params).fetchall()
+        for digest, page_platform, page_username in rows:
+            try:
+                with gzip.open(self.page_path(digest), 'rb') as f:
+                    yield page_platform, page_username, f.read().decode('utf-8')
+            except FileNotFoundError:
+                continue
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
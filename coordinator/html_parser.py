@@ -0,0 +1,158 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 解析后端: auto / selectolax / lxml / html.parser
+# auto按selectolax、lxml、html.parser的顺序选择第一个可用的后端
+HTML_PARSER_BACKEND = os.getenv('HTML_PARSER_BACKEND', 'auto')
+
+# 提取内容用到的CSS选择器，html.parser和lxml后端在初始化时预编译
+SELECTORS = {
+    'tweet': 'article',
+    'tweet_text': 'div[data-testid="tweetText"]',
+    'tweet_time': 'time',
+    'tweet_stats': 'span[data-testid$="-count"]',
+    'note': '.note-item',
+    'note_title': '.title',
+    'note_desc': '.desc',
+    'note_time': '.time',
+    'note_likes': '.like span',
+    'note_comments': '.comment span'
+}
+
+class SoupBackend:
+    """BeautifulSoup + html.parser，无额外依赖的兜底后端"""
+
+    name = 'html.parser'
+
+    def __init__(self):
+        import soupsieve
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+        self._selectors = {key: soupsieve.compile(css) for key, css in SELECTORS.items()}
+
+    def parse(self, html_content):
+        return self._soup(html_content, 'html.parser')
+
+    def select(self, node, key):
+        return self._selectors[key].select(node)
+
+    def select_one(self, node, key):
+        return self._selectors[key].select_one(node)
+
+    def text(self, node):
+        return node.get_text()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+class LxmlBackend:
+    """lxml.html + 预编译的cssselect选择器"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        from lxml.cssselect import CSSSelector
+        self._document_fromstring = lxml.html.document_fromstring
+        self._selectors = {key: CSSSelector(css) for key, css in SELECTORS.items()}
+
+    def parse(self, html_content):
+        # fromstring对单根片段返回该元素本身，会被select当作节点自身排除；
+        # 按完整文档解析，根节点始终是<html>
+        return self._document_fromstring(html_content)
+
+    def select(self, node, key):
+        # cssselect按descendant-or-self匹配，排除节点自身以与BeautifulSoup保持一致
+        return [match for match in self._selectors[key](node) if match is not node]
+
+    def select_one(self, node, key):
+        matches = self.select(node, key)
+        return matches[0] if matches else None
+
+    def text(self, node):
+        return node.text_content()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+class SelectolaxBackend:
+    """selectolax(lexbor引擎)，最快的后端
+
+    selectolax不提供可复用的编译后选择器，每次查询直接传入CSS字符串。
+    """
+
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def parse(self, html_content):
+        return self._parser(html_content)
+
+    def select(self, node, key):
+        matches = node.css(SELECTORS[key])
+        # 节点自身也会参与匹配，排除以与BeautifulSoup保持一致
+        node_id = getattr(node, 'mem_id', None)
+        return [match for match in matches if match.mem_id != node_id]
+
+    def select_one(self, node, key):
+        matches = self.select(node, key)
+        return matches[0] if matches else None
+
+    def text(self, node):
+        return node.text(deep=True)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+BACKENDS = {
+    'selectolax': SelectolaxBackend,
+    'lxml': LxmlBackend,
+    'html.parser': SoupBackend
+}
+
+_instances = {}
+
+def available_backends():
+    """返回当前环境中可用的后端名称"""
+    names = []
+    for name in BACKENDS:
+        try:
+            get_backend(name, fallback=False)
+            names.append(name)
+        except ImportError:
+            continue
+    return names
+
+def get_backend(name=None, fallback=True):
+    """获取解析后端实例，指定后端不可用时回退到html.parser"""
+    name = name or HTML_PARSER_BACKEND
+    if name in _instances:
+        return _instances[name]
+
+    if name == 'auto':
+        for candidate in BACKENDS:
+            try:
+                backend = get_backend(candidate, fallback=False)
+            except ImportError:
+                continue
+            _instances['auto'] = backend
+            return backend
+
+    if name not in BACKENDS:
+        logger.warning(f"未知的HTML解析后端: {name}，使用html.parser")
+        name = 'html.parser'
+
+    try:
+        backend = BACKENDS[name]()
+    except ImportError:
+        if not fallback:
+            raise
+        logger.warning(f"HTML解析后端{name}不可用，使用html.parser")
+        return get_backend('html.parser')
+
+    _instances[name] = backend
+    return backend
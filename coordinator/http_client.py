@@ -0,0 +1,91 @@
+import os
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# 超时配置(秒)
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '60'))
+
+# 重试配置：5xx和连接错误时按指数退避加随机抖动重试
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.5'))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '30'))
+
+# 每个MCP服务保持的长连接数量
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(base_url):
+    """获取某个MCP服务地址对应的会话，同一地址共享一个keep-alive连接池"""
+    session = _sessions.get(base_url)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, pool_block=True)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[base_url] = session
+        return session
+
+def backoff_delay(attempt):
+    """第attempt次重试前的等待时间(全抖动指数退避)"""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+def request_not_sent(error):
+    """异常是否发生在建立连接阶段(请求确定没有发出)
+
+    连接被拒绝或连接超时时服务端没有收到请求；读超时、连接在发送后被断开时
+    服务端可能已经处理了请求。
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    # requests把urllib3的MaxRetryError包在ConnectionError中，真正的原因在reason里
+    return isinstance(getattr(reason, 'reason', reason), ConnectTimeoutError)
+
+def post(base_url, path, json=None, timeout=None, retries=None, idempotent=True, **kwargs):
+    """向MCP服务发送POST请求
+
+    5xx响应和连接错误会重试，重试耗尽后返回最后一次响应或抛出最后一次异常。
+    非幂等请求(如追加记录)设置idempotent=False，只在请求确定没有发出时重试，
+    读超时或连接中途断开时直接抛出，以免重复写入。
+    """
+    session = get_session(base_url)
+    url = f"{base_url}{path}"
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    retries = HTTP_MAX_RETRIES if retries is None else retries
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.post(url, json=json, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            retryable = idempotent or request_not_sent(e)
+            if attempt >= retries or not retryable:
+                raise
+            logger.warning(f"请求{url}失败({type(e).__name__})，准备第{attempt + 1}次重试")
+        else:
+            if response.status_code < 500 or attempt >= retries:
+                return response
+            logger.warning(f"请求{url}返回HTTP {response.status_code}，准备第{attempt + 1}次重试")
+
+        time.sleep(backoff_delay(attempt))
+
+def close_all():
+    """关闭所有连接池"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
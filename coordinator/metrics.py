@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+# 常驻模式下Prometheus指标接口的端口，0表示不启动
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+# 单次运行结束时写入的JSON指标汇总
+METRICS_SUMMARY_PATH = os.getenv('METRICS_SUMMARY_PATH', 'coordinator/state/metrics_summary.json')
+
+# 耗时直方图的桶上限(秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 汇总中列出的最慢账号数
+SLOWEST_ACCOUNTS = 10
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+class Histogram:
+    """固定分桶的耗时直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """按桶上限估算分位数，落在最后一个桶时返回最大值"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+class MetricsRegistry:
+    """协调器热点路径的指标：各阶段耗时直方图、计数、接收字节数和错误分类
+
+    stage取值: get_scrape_tool、scrape、parse、format、send、send_chunk。
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._account_seconds = {}
+        self._started_at = time.time()
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, **labels):
+        key = _label_key(dict(labels, stage=stage))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def error(self, stage, error_class, **labels):
+        """按阶段和错误类型计数，如http_429、empty_html、ConnectionError"""
+        self.inc('errors', stage=stage, error=error_class, **labels)
+
+    def account_seconds(self, platform, username, seconds):
+        """记录账号最近一次抓取的总耗时(含限速等待和解析)，用于找出慢账号"""
+        with self._lock:
+            self._account_seconds[(platform, username)] = seconds
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._account_seconds.clear()
+            self._started_at = time.time()
+
+    def render_prometheus(self):
+        """以Prometheus文本格式输出全部指标"""
+        lines = []
+        with self._lock:
+            lines.append("# HELP coordinator_stage_duration_seconds 各阶段耗时")
+            lines.append("# TYPE coordinator_stage_duration_seconds histogram")
+            for key, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"coordinator_stage_duration_seconds_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+                lines.append(f"coordinator_stage_duration_seconds_bucket{_format_labels(key, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"coordinator_stage_duration_seconds_sum{_format_labels(key)} {histogram.sum}")
+                lines.append(f"coordinator_stage_duration_seconds_count{_format_labels(key)} {histogram.count}")
+
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE coordinator_{name}_total counter")
+                for (counter_name, key), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        lines.append(f"coordinator_{name}_total{_format_labels(key)} {value}")
+
+            lines.append("# HELP coordinator_account_scrape_seconds 账号最近一次抓取的总耗时")
+            lines.append("# TYPE coordinator_account_scrape_seconds gauge")
+            for (platform, username), seconds in sorted(self._account_seconds.items()):
+                labels = _format_labels((("platform", platform), ("username", username)))
+                lines.append(f"coordinator_account_scrape_seconds{labels} {round(seconds, 4)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """JSON友好的指标汇总"""
+        with self._lock:
+            stages = {}
+            for key, histogram in sorted(self._histograms.items()):
+                labels = dict(key)
+                name = labels.pop("stage")
+                if labels:
+                    name += "[" + ",".join(f"{k}={v}" for k, v in labels.items()) + "]"
+                stages[name] = {
+                    "count": histogram.count,
+                    "total_seconds": round(histogram.sum, 4),
+                    "mean_seconds": round(histogram.sum / histogram.count, 4) if histogram.count else 0,
+                    "p50_seconds": histogram.quantile(0.5),
+                    "p95_seconds": histogram.quantile(0.95),
+                    "max_seconds": round(histogram.max, 4)
+                }
+            counters = {}
+            for (name, key), value in sorted(self._counters.items()):
+                label = ",".join(f"{k}={v}" for k, v in key)
+                counters[f"{name}[{label}]" if label else name] = value
+            slowest = sorted(self._account_seconds.items(), key=lambda entry: entry[1], reverse=True)
+            return {
+                "started_at": self._started_at,
+                "elapsed_seconds": round(time.time() - self._started_at, 3),
+                "stages": stages,
+                "counters": counters,
+                "slowest_accounts": [
+                    {"platform": platform, "username": username, "seconds": round(seconds, 4)}
+                    for (platform, username), seconds in slowest[:SLOWEST_ACCOUNTS]
+                ]
+            }
+
+    def write_summary(self, path=METRICS_SUMMARY_PATH):
+        """输出并保存本次运行的指标汇总"""
+        summary = self.summary()
+        for name, stage in summary["stages"].items():
+            logger.info(f"指标 {name}: {stage['count']}次，平均{stage['mean_seconds']}秒，"
+                        f"P95 {stage['p95_seconds']}秒，最大{stage['max_seconds']}秒")
+        if summary["slowest_accounts"]:
+            slowest = summary["slowest_accounts"][0]
+            logger.info(f"最慢账号: {slowest['platform']}:{slowest['username']} ({slowest['seconds']}秒)")
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            logger.info(f"指标汇总已保存到: {path}")
+        except OSError as e:
+            logger.warning(f"保存指标汇总失败: {str(e)}")
+        return summary
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Prometheus抓取接口: GET /metrics"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(registry, port=METRICS_PORT, host='0.0.0.0'):
+    """在后台线程中启动指标接口，返回服务对象"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"指标接口运行在 http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+# 进程内共享的指标
+metrics = MetricsRegistry()
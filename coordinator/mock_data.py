@@ -1,9 +1,10 @@
 import json
+import html
 import random
 from datetime import datetime, timedelta
 
-def generate_mock_twitter_data(username, count=5):
-    """生成模拟的Twitter数据"""
+def generate_mock_twitter_data(username, count=5, days_ago=0):
+    """生成模拟的Twitter数据，days_ago将发布时间整体前移，用于模拟更早的分页"""
     mock_data = []
     
     # 一些可能的内容模板
@@ -18,7 +19,7 @@ def generate_mock_twitter_data(username, count=5):
     for i in range(count):
         # 生成随机的发布时间，最近7天内
         posted_time = datetime.now() - timedelta(
-            days=random.randint(0, 6),
+            days=days_ago + random.randint(0, 6),
             hours=random.randint(0, 23),
             minutes=random.randint(0, 59)
         )
@@ -41,8 +42,8 @@ def generate_mock_twitter_data(username, count=5):
     
     return mock_data
 
-def generate_mock_xiaohongshu_data(username, count=5):
-    """生成模拟的小红书数据"""
+def generate_mock_xiaohongshu_data(username, count=5, days_ago=0):
+    """生成模拟的小红书数据，days_ago将发布时间整体前移，用于模拟更早的分页"""
     mock_data = []
     
     # 一些可能的内容模板
@@ -57,7 +58,7 @@ def generate_mock_xiaohongshu_data(username, count=5):
     for i in range(count):
         # 生成随机的发布时间，最近14天内
         posted_time = datetime.now() - timedelta(
-            days=random.randint(0, 13),
+            days=days_ago + random.randint(0, 13),
             hours=random.randint(0, 23),
             minutes=random.randint(0, 59)
         )
@@ -79,6 +80,77 @@ def generate_mock_xiaohongshu_data(username, count=5):
     
     return mock_data
 
+def format_mock_stat(number, chinese=False):
+    """将数字格式化为页面上显示的形式，如'1.2K'、'3.5万'"""
+    if chinese and number >= 10000:
+        return f"{number / 10000:.1f}万"
+    if not chinese and number >= 1000:
+        return f"{number / 1000:.1f}K"
+    return str(number)
+
+def format_mock_relative_time(timestamp):
+    """将时间格式化为小红书页面上的相对时间"""
+    delta = datetime.now() - datetime.fromisoformat(timestamp)
+    if delta < timedelta(hours=1):
+        return f"{max(1, delta.seconds // 60)}分钟前"
+    if delta < timedelta(days=1):
+        return f"{delta.seconds // 3600}小时前"
+    if delta < timedelta(days=7):
+        return f"{delta.days}天前"
+    return datetime.fromisoformat(timestamp).strftime('%Y-%m-%d')
+
+def render_twitter_html(items):
+    """将推文数据渲染为与抓取选择器结构一致的Twitter个人页面HTML"""
+    articles = []
+    for item in items:
+        articles.append(
+            '<article role="article"><div class="css-1dbjc4n">'
+            f'<div class="user"><span>{html.escape(item["username"])}</span>'
+            f'<time datetime="{item["timestamp"]}">{item["timestamp"][:10]}</time></div>'
+            f'<div lang="zh" data-testid="tweetText"><span>{html.escape(item["content"])}</span></div>'
+            '<div role="group">'
+            f'<div data-testid="reply"><span data-testid="app-text-transition-container"><span data-testid="reply-count">{format_mock_stat(item["replies"])}</span></span></div>'
+            f'<div data-testid="retweet"><span data-testid="retweet-count">{format_mock_stat(item["retweets"])}</span></div>'
+            f'<div data-testid="like"><span data-testid="like-count">{format_mock_stat(item["likes"])}</span></div>'
+            '</div></div></article>'
+        )
+    return (
+        '<!DOCTYPE html><html lang="zh"><head><meta charset="utf-8"><title>Twitter</title></head>'
+        '<body><div id="react-root"><nav role="navigation"><a href="/home">Home</a><a href="/explore">Explore</a></nav>'
+        f'<main role="main"><section aria-labelledby="timeline">{"".join(articles)}</section></main>'
+        '</div></body></html>'
+    )
+
+def render_xiaohongshu_html(items):
+    """将笔记数据渲染为与抓取选择器结构一致的小红书个人页面HTML"""
+    notes = []
+    for item in items:
+        title, _, desc = item["content"].partition("\n")
+        notes.append(
+            '<section class="note-item"><div class="cover"><img src="https://example.com/cover.jpg"></div>'
+            f'<div class="footer"><a class="title"><span>{html.escape(title)}</span></a>'
+            f'<div class="desc">{html.escape(desc)}</div>'
+            f'<div class="author"><span class="name">{html.escape(item["username"])}</span>'
+            f'<span class="time">{format_mock_relative_time(item["timestamp"])}</span></div>'
+            f'<span class="like"><svg class="icon"></svg><span>{format_mock_stat(item["likes"], chinese=True)}</span></span>'
+            f'<span class="comment"><svg class="icon"></svg><span>{format_mock_stat(item["comments"], chinese=True)}</span></span>'
+            '</div></section>'
+        )
+    return (
+        '<!DOCTYPE html><html lang="zh-CN"><head><meta charset="utf-8"><title>小红书</title></head>'
+        '<body><div id="app"><div class="header"><a href="/explore">发现</a></div>'
+        f'<div class="feeds-container">{"".join(notes)}</div>'
+        '</div></body></html>'
+    )
+
+def generate_mock_twitter_html(username, count=10, days_ago=0):
+    """生成模拟的Twitter个人页面HTML"""
+    return render_twitter_html(generate_mock_twitter_data(username, count, days_ago))
+
+def generate_mock_xiaohongshu_html(username, count=10, days_ago=0):
+    """生成模拟的小红书个人页面HTML"""
+    return render_xiaohongshu_html(generate_mock_xiaohongshu_data(username, count, days_ago))
+
 def save_mock_data_to_file(data, filename="mock_data.json"):
     """将模拟数据保存到文件"""
     with open(filename, 'w', encoding='utf-8') as f:
@@ -0,0 +1,279 @@
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from mock_data import generate_mock_twitter_html, generate_mock_xiaohongshu_html
+
+SCRAPE_TOOL = {
+    "operation_id": "scrape_webpage",
+    "description": "抓取网页HTML(本地模拟)",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "url": {"type": "string"},
+            "selector": {"type": "string"},
+            "cursor": {"type": "string", "description": "分页游标，取自上一页结果的next_cursor"}
+        },
+        "required": ["url"]
+    }
+}
+
+FEISHU_TOOL = {
+    "operation_id": "append_to_bitable",
+    "description": "添加数据到飞书多维表格(本地模拟)",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "records": {"type": "array", "items": {"type": "object"}}
+        },
+        "required": ["records"]
+    }
+}
+
+def parse_profile_url(url):
+    """从个人主页URL中解析平台和账号"""
+    parsed = urllib.parse.urlparse(url)
+    path = urllib.parse.unquote(parsed.path).strip('/')
+    if 'xiaohongshu.com' in parsed.netloc:
+        return 'xiaohongshu', path.rsplit('/', 1)[-1]
+    return 'twitter', path.split('/', 1)[0]
+
+class MockHandler(BaseHTTPRequestHandler):
+    """模拟MCP服务的/tools和/tools/{operation_id}接口"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self.path == '/tools':
+            self._send_json(200, {"tools": [self.server.tool]})
+        elif self.path == f"/tools/{self.server.tool['operation_id']}":
+            failure = self.server.simulate()
+            if failure:
+                self._send_json(*failure)
+                return
+            self._send_json(200, {"result": self.server.handle_tool(payload.get("parameters", {}))})
+        else:
+            self._send_json(400, {"error": "未知操作"})
+
+class MockMCPServer(ThreadingHTTPServer):
+    """模拟MCP服务的公共部分：可配置的延迟、错误率和限流
+
+    - latency_ms / jitter_ms: 每次工具调用的固定延迟和随机附加延迟
+    - error_rate: 返回HTTP 500的概率
+    - rate_limit: 每秒允许的工具调用次数，超出时返回429和Retry-After，0表示不限流
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limit=0):
+        super().__init__(address, MockHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        # 桶容量至少为1，限流低于每秒1次时也能攒够一个令牌
+        self._capacity = max(1, rate_limit)
+        self._tokens = self._capacity
+        self._refilled_at = time.monotonic()
+
+    def _take_token(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._refilled_at) * self.rate_limit)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def simulate(self):
+        """模拟网络延迟和故障，返回(状态码, 响应体, 响应头)表示本次调用失败，None表示正常"""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit and not self._take_token():
+                self.throttled += 1
+                retry_after = str(max(1, math.ceil(1 / self.rate_limit)))
+                return 429, {"error": "请求过于频繁"}, {"Retry-After": retry_after}
+
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if self.error_rate and random.random() < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return 500, {"error": "模拟的服务端错误"}, None
+        return None
+
+    def summary(self):
+        return {"requests": self.requests, "errors": self.errors, "throttled": self.throttled}
+
+class MockScraperServer(MockMCPServer):
+    """模拟web-scraper-mcp，返回由mock_data生成的个人主页HTML
+
+    - posts_per_page: 每页的帖子数
+    - pages: 每个账号的历史页数，大于1时结果中带next_cursor，越往后的页面发布时间越早
+    - empty_rate: 返回空HTML的概率(模拟被平台拦截)
+    - dynamic: 每次请求重新生成页面，互动数据随之变化
+    """
+
+    # 相邻两页之间发布时间相差的天数
+    DAYS_PER_PAGE = 14
+
+    tool = SCRAPE_TOOL
+
+    def __init__(self, address, posts_per_page=10, pages=1, empty_rate=0.0, dynamic=False, **options):
+        super().__init__(address, **options)
+        self.posts_per_page = posts_per_page
+        self.pages = pages
+        self.empty_rate = empty_rate
+        self.dynamic = dynamic
+        self._pages = {}
+
+    def render_page(self, platform, username, page_number=0):
+        """同一账号的页面只生成一次，避免模拟服务自身的开销影响测量"""
+        key = (platform, username, page_number)
+        page = None if self.dynamic else self._pages.get(key)
+        if page is None:
+            days_ago = page_number * self.DAYS_PER_PAGE
+            if platform == 'xiaohongshu':
+                page = generate_mock_xiaohongshu_html(username, self.posts_per_page, days_ago)
+            else:
+                page = generate_mock_twitter_html(username, self.posts_per_page, days_ago)
+            self._pages[key] = page
+        return page
+
+    def handle_tool(self, parameters):
+        if self.empty_rate and random.random() < self.empty_rate:
+            return {"html": ""}
+        platform, username = parse_profile_url(parameters.get("url", ""))
+        try:
+            page_number = int(parameters.get("cursor") or 0)
+        except ValueError:
+            page_number = 0
+        result = {"html": self.render_page(platform, username, page_number)}
+        if page_number + 1 < self.pages:
+            result["next_cursor"] = str(page_number + 1)
+        return result
+
+class MockFeishuServer(MockMCPServer):
+    """模拟feishu-mcp的append_to_bitable，只统计收到的记录数
+
+    - max_records: 单次写入的记录数上限，与飞书batch_create一致，超出时写入失败
+    - reject_rate: 返回success=false的概率(模拟批次中有坏记录)
+    """
+
+    tool = FEISHU_TOOL
+
+    def __init__(self, address, max_records=500, reject_rate=0.0, **options):
+        super().__init__(address, **options)
+        self.max_records = max_records
+        self.reject_rate = reject_rate
+        self.records = 0
+
+    def handle_tool(self, parameters):
+        records = parameters.get("records", [])
+        if len(records) > self.max_records:
+            return {"success": False, "message": f"单次最多写入{self.max_records}条记录"}
+        if self.reject_rate and random.random() < self.reject_rate:
+            return {"success": False, "message": "模拟的记录校验失败"}
+        with self._lock:
+            self.records += len(records)
+        return {"success": True, "message": f"成功添加{len(records)}条记录"}
+
+    def summary(self):
+        return dict(super().summary(), records=self.records)
+
+def start_server(server):
+    """在后台线程中运行服务，返回服务地址"""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+def start_mock_servers(host='127.0.0.1', scraper_port=0, feishu_port=0, scraper_options=None, feishu_options=None):
+    """启动两个模拟服务(端口为0时自动分配)，返回(抓取服务, 飞书服务)"""
+    scraper_server = MockScraperServer((host, scraper_port), **(scraper_options or {}))
+    feishu_server = MockFeishuServer((host, feishu_port), **(feishu_options or {}))
+    start_server(scraper_server)
+    start_server(feishu_server)
+    return scraper_server, feishu_server
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟web-scraper-mcp和feishu-mcp，用于压测协调器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--scraper-port', type=int, default=3001)
+    parser.add_argument('--feishu-port', type=int, default=3002)
+    parser.add_argument('--latency-ms', type=float, default=0, help='抓取调用的固定延迟')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='抓取调用的随机附加延迟')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='抓取调用返回500的概率')
+    parser.add_argument('--rate-limit', type=float, default=0, help='抓取调用每秒上限，超出返回429')
+    parser.add_argument('--empty-rate', type=float, default=0.0, help='返回空HTML的概率')
+    parser.add_argument('--posts-per-page', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=1, help='每个账号的历史页数(用于测试回填)')
+    parser.add_argument('--dynamic', action='store_true', help='每次请求重新生成页面')
+    parser.add_argument('--feishu-latency-ms', type=float, default=0, help='飞书写入的固定延迟')
+    parser.add_argument('--feishu-error-rate', type=float, default=0.0, help='飞书写入返回500的概率')
+    parser.add_argument('--feishu-reject-rate', type=float, default=0.0, help='飞书写入返回success=false的概率')
+    parser.add_argument('--feishu-rate-limit', type=float, default=0, help='飞书写入每秒上限，超出返回429')
+    args = parser.parse_args()
+
+    scraper_server, feishu_server = start_mock_servers(
+        args.host, args.scraper_port, args.feishu_port,
+        scraper_options={
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit,
+            "empty_rate": args.empty_rate,
+            "posts_per_page": args.posts_per_page,
+            "pages": args.pages,
+            "dynamic": args.dynamic
+        },
+        feishu_options={
+            "latency_ms": args.feishu_latency_ms,
+            "error_rate": args.feishu_error_rate,
+            "reject_rate": args.feishu_reject_rate,
+            "rate_limit": args.feishu_rate_limit
+        }
+    )
+    print(f"模拟web-scraper-mcp运行在 http://{args.host}:{args.scraper_port}")
+    print(f"模拟feishu-mcp运行在 http://{args.host}:{args.feishu_port}")
+    print("按Ctrl+C停止")
+
+    try:
+        while True:
+            time.sleep(10)
+            print(f"抓取服务: {scraper_server.summary()}  飞书服务: {feishu_server.summary()}")
+    except KeyboardInterrupt:
+        scraper_server.shutdown()
+        feishu_server.shutdown()
+        print(f"抓取服务: {scraper_server.summary()}  飞书服务: {feishu_server.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import unicodedata
+import threading
+
+from seen_index import post_fingerprint
+from sqlite_store import connect
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 是否合并近似重复的内容(跨账号、跨平台转发的同一条公告)，开启后记录中会带"关联来源"字段
+# 转发晚于原帖被抓到时，直接写入模式(FEISHU_WRITE_MODE=direct)会补写原帖记录的"关联来源"；
+# 追加写入无法修改已有的行，来源只保存在本地索引中
+NEAR_DUP_ENABLED = os.getenv('NEAR_DUP_ENABLED', '').lower() in ('1', 'true', 'yes')
+NEAR_DUP_DB_PATH = os.getenv('NEAR_DUP_DB_PATH', 'coordinator/state/near_dup.db')
+# SimHash汉明距离不超过该值视为近似重复，必须小于分段数(4)才能保证被LSH索引找到
+NEAR_DUP_MAX_DISTANCE = int(os.getenv('NEAR_DUP_MAX_DISTANCE', '3'))
+# 规范化后短于该长度的内容不做判断，短文本的SimHash区分度不够
+NEAR_DUP_MIN_CHARS = int(os.getenv('NEAR_DUP_MIN_CHARS', '12'))
+# 签名保留天数
+NEAR_DUP_RETENTION_DAYS = int(os.getenv('NEAR_DUP_RETENTION_DAYS', '90'))
+
+SHINGLE_SIZE = 3
+# 64位签名分为4段，每段16位；距离不超过3时至少有一段完全相同(鸽巢原理)
+BANDS = 4
+BAND_BITS = 16
+_BAND_MASK = (1 << BAND_BITS) - 1
+_SIGNATURE_MASK = (1 << 64) - 1
+
+# 链接、话题标签和@提及不参与比较，转发时经常只有这些不同
+_NOISE = re.compile(r'https?://\S+|#[^#\s]+#?|@\S+')
+_NON_WORD = re.compile(r'[\W_]+')
+
+def normalize_content(content):
+    text = unicodedata.normalize('NFKC', content).lower()
+    return _NON_WORD.sub('', _NOISE.sub('', text))
+
+def _shingle_hashes(text):
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    return [hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles]
+
+def simhash(content):
+    """内容的64位SimHash签名，内容过短时返回None"""
+    text = normalize_content(content)
+    if len(text) < NEAR_DUP_MIN_CHARS:
+        return None
+    hashes = _shingle_hashes(text)
+    if np is not None:
+        # 每个分片哈希展开为64个比特，按列统计1的个数超过半数的比特置1
+        bits = np.unpackbits(np.frombuffer(b''.join(hashes), dtype=np.uint8)).reshape(len(hashes), 64)
+        majority = bits.sum(axis=0) * 2 > len(hashes)
+        return int.from_bytes(np.packbits(majority).tobytes(), 'big')
+    counts = [0] * 64
+    for digest in hashes:
+        value = int.from_bytes(digest, 'big')
+        for bit in range(64):
+            if value >> (63 - bit) & 1:
+                counts[bit] += 1
+    result = 0
+    for count in counts:
+        result = (result << 1) | (count * 2 > len(hashes))
+    return result
+
+def band_keys(signature):
+    """签名每一段的LSH桶编号：段序号(高位) + 段的值"""
+    return [(band << BAND_BITS) | (signature >> (band * BAND_BITS) & _BAND_MASK) for band in range(BANDS)]
+
+def _to_signed(value):
+    # SQLite的INTEGER是有符号64位
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+class NearDupIndex:
+    """近似重复内容检测
+
+    每条内容计算SimHash签名，签名按段存入LSH桶(SQLite主键索引)。
+    查询时只取与新签名至少一段相同的候选再比较汉明距离，
+    索引中有数百万条签名时单条查询也只是几次主键查找。
+    """
+
+    def __init__(self, path=NEAR_DUP_DB_PATH, max_distance=NEAR_DUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            "post_key BLOB PRIMARY KEY, "
+            "signature INTEGER NOT NULL, "
+            "platform TEXT NOT NULL, "
+            "username TEXT NOT NULL, "
+            "added_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            "band_key INTEGER NOT NULL, "
+            "post_key BLOB NOT NULL, "
+            "signature INTEGER NOT NULL, "
+            "PRIMARY KEY (band_key, post_key)"
+            ") WITHOUT ROWID"
+        )
+        # 被合并的转发来源，按代表内容的指纹聚簇；applied为0表示尚未写入代表记录的"关联来源"
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            "canonical_key BLOB NOT NULL, "
+            "platform TEXT NOT NULL, "
+            "username TEXT NOT NULL, "
+            "timestamp TEXT NOT NULL, "
+            "applied INTEGER NOT NULL, "
+            "PRIMARY KEY (canonical_key, platform, username, timestamp)"
+            ") WITHOUT ROWID"
+        )
+        self._prune()
+        self._conn.commit()
+
+    def _prune(self):
+        expired = self._conn.execute(
+            "SELECT post_key, signature FROM signatures WHERE added_at < ?",
+            (time.time() - NEAR_DUP_RETENTION_DAYS * 86400,)
+        ).fetchall()
+        if not expired:
+            return
+        self._conn.executemany(
+            "DELETE FROM bands WHERE band_key = ? AND post_key = ?",
+            [(band_key, key) for key, signature in expired for band_key in band_keys(signature & _SIGNATURE_MASK)]
+        )
+        self._conn.executemany("DELETE FROM signatures WHERE post_key = ?", [(key,) for key, _ in expired])
+        self._conn.executemany("DELETE FROM links WHERE canonical_key = ?", [(key,) for key, _ in expired])
+        logger.info(f"已清理{len(expired)}条过期的内容签名")
+
+    def find(self, signature, exclude_key=None):
+        """查找索引中与签名近似的一条历史内容，返回其指纹或None"""
+        for band_key in band_keys(signature):
+            # 桶中的行按主键聚簇存放，连同签名一次读出，不需要回表
+            for key, other in self._conn.execute(
+                "SELECT post_key, signature FROM bands WHERE band_key = ?", (band_key,)
+            ):
+                if key != exclude_key and bin((other & _SIGNATURE_MASK) ^ signature).count('1') <= self.max_distance:
+                    return key
+        return None
+
+    def _add(self, key, signature, item):
+        signed = _to_signed(signature)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?)",
+            (key, signed, item.get("platform", ""), item.get("username", ""), time.time())
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO bands VALUES (?, ?, ?)",
+            [(band_key, key, signed) for band_key in band_keys(signature)]
+        )
+
+    def _sources(self, key):
+        return [
+            {"platform": platform, "username": username, "timestamp": timestamp}
+            for platform, username, timestamp in self._conn.execute(
+                "SELECT platform, username, timestamp FROM links WHERE canonical_key = ? ORDER BY timestamp", (key,)
+            )
+        ]
+
+    def group(self, items):
+        """合并近似重复的内容，返回(要发送的内容, 被合并的重复内容, 需补写到已发送记录的来源数)
+
+        批次内的近似重复以发布时间最早的一条为代表，全部来源记入代表的linked_sources；
+        与此前已发送内容近似重复的转发(通常来自其他账号、其他平台的抓取结果)直接合并掉，
+        来源记在该代表内容名下，等待pending_links/mark_links_applied补写到已发送的记录。
+        代表内容随即加入索引，后续批次中的转发也能被识别。
+        """
+        representatives = {}
+        duplicates = []
+        late_links = 0
+        with self._lock:
+            for item in sorted(items, key=lambda item: item.get("timestamp", "")):
+                signature = simhash(item.get("content", ""))
+                if signature is None:
+                    continue
+                key = post_fingerprint(item)
+                match = self.find(signature, exclude_key=key)
+                if match is None:
+                    self._add(key, signature, item)
+                    representatives[key] = item
+                    continue
+                duplicates.append(item)
+                # 代表内容在本批次中时随代表记录一起发送，否则等待补写
+                in_batch = match in representatives
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO links VALUES (?, ?, ?, ?, ?)",
+                    (match, item.get("platform", ""), item.get("username", ""), item.get("timestamp", ""),
+                     int(in_batch))
+                )
+                if not in_batch:
+                    late_links += cursor.rowcount
+            for key, item in representatives.items():
+                # 代表内容重新发送(如互动数据变化)时带上此前记录的全部来源
+                sources = self._sources(key)
+                if sources:
+                    item["linked_sources"] = sources
+                else:
+                    item.pop("linked_sources", None)
+            if representatives:
+                self._conn.execute(
+                    f"UPDATE links SET applied = 1 WHERE canonical_key IN ({','.join('?' * len(representatives))})",
+                    list(representatives)
+                )
+            self._conn.commit()
+        merged = {id(item) for item in duplicates}
+        return [item for item in items if id(item) not in merged], duplicates, late_links
+
+    def pending_links(self):
+        """尚未写入代表记录的来源，返回{代表内容指纹: 该内容的全部来源}"""
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute("SELECT DISTINCT canonical_key FROM links WHERE applied = 0")]
+            return {key: self._sources(key) for key in keys}
+
+    def mark_links_applied(self, keys):
+        """记录代表记录的"关联来源"已更新"""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE links SET applied = 1 WHERE canonical_key = ?", [(key,) for key in keys])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,244 @@
+import os
+import queue
+import logging
+import threading
+
+from batch_uploader import FEISHU_BATCH_SIZE, FEISHU_UPLOAD_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# 阶段之间队列的最大长度，队列满时上游阶段等待，从而限制内存占用
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '64'))
+
+# 队列结束标记
+_DONE = object()
+
+class _BatchTracker:
+    """一个抓取结果列表中待发送内容的完成情况"""
+
+    def __init__(self, items, remaining):
+        self.items = items
+        self.remaining = remaining
+        self.failed = False
+
+class Pipeline:
+    """抓取 → 去重 → 格式化 → 分批发送 → 备份 的流式处理管道
+
+    去重/格式化和发送分别在独立线程中运行，阶段之间通过有界队列衔接。
+    待发送内容凑满一个批次就立即发送，不必等待所有账号抓取完成。
+    """
+
+    def __init__(self, format_records, send_records=None, seen_index=None, backup=None,
+                 engagement=None, batch_size=None, senders=None, on_batch_sent=None, near_dup=None,
+                 record_keys=None, update_links=None, send_changed=True, on_sent=None):
+        self.format_records = format_records
+        self.send_records = send_records
+        self.seen_index = seen_index
+        self.backup = backup
+        self.engagement = engagement
+        # 近似重复检测(NearDupIndex)，为None时不合并
+        self.near_dup = near_dup
+        self.batch_size = batch_size or FEISHU_BATCH_SIZE
+        self.senders = senders or FEISHU_UPLOAD_CONCURRENCY
+        # 一个抓取结果列表中需要发送的内容全部写入成功(并已记为已发送)后，以原列表回调；
+        # 有内容发送失败、处理出错或未实际发送(模拟模式)时不回调
+        self.on_batch_sent = on_batch_sent
+        # 内容 → 所属列表的完成情况
+        self._trackers = {}
+        self._trackers_lock = threading.Lock()
+        # 设置时以send_records(记录, 每条内容的record_keys(item))发送，用于按帖子更新已有记录
+        self.record_keys = record_keys
+        # 把近似重复的来源补写到此前已发送的代表记录：update_links({代表内容指纹: 来源})返回已更新的指纹；
+        # 为None时(追加写入无法修改已有行)来源只保存在近似重复索引中
+        self.update_links = update_links
+        # 为False时互动数据变化的帖子不再发送(追加写入会多出一行)，只在本地更新记录的互动数据
+        self.send_changed = send_changed
+        # 每批发送后以已写入(含结果未知)的内容回调，动态分片时登记到共享的租约数据库
+        self.on_sent = on_sent
+        self.stats = {"collected": 0, "new": 0, "changed": 0, "skipped": 0, "sent": 0, "failed": 0,
+                      "unknown": 0, "near_duplicates": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, **values):
+        with self._stats_lock:
+            for key, value in values.items():
+                self.stats[key] += value
+
+    def _process(self, item_queue, send_queue):
+        """去重、格式化并按批次放入发送队列"""
+        pending = []
+        while True:
+            items = item_queue.get()
+            if items is _DONE:
+                break
+            try:
+                if self.backup:
+                    self.backup.write(items)
+                if self.engagement:
+                    self.engagement.record(items)
+
+                to_send = items
+                if self.seen_index:
+                    # 认领要发送的帖子，同时运行的其他管道(历史回填)不会重复发送
+                    new_items, changed_items = self.seen_index.classify(items, owner=self)
+                    self._count(new=len(new_items), changed=len(changed_items),
+                                skipped=len(items) - len(new_items) - len(changed_items))
+                    if changed_items and not self.send_changed and self.send_records:
+                        self.seen_index.mark(changed_items)
+                        changed_items = []
+                    to_send = new_items + changed_items
+                if self.near_dup:
+                    to_send, duplicates, late_links = self.near_dup.group(to_send)
+                    self._count(near_duplicates=len(duplicates))
+                    if self.seen_index and duplicates:
+                        # 被合并的转发由代表记录承载来源，记为已处理，下次不再重复判断
+                        self.seen_index.mark(duplicates)
+                    if late_links and self.update_links:
+                        self._apply_links()
+                    elif late_links and self.send_records:
+                        logger.info(f"{late_links}条内容与已发送的记录近似重复，追加写入模式下无法补写"
+                                    f"已有记录的关联来源，来源已保存在近似重复索引中")
+                if self.engagement:
+                    self.engagement.annotate(to_send)
+                # 部分帖子由其他管道发送时无法确认整页送达，不回调
+                self._track(items, to_send, deferred=bool(
+                    self.on_batch_sent and self.seen_index and self.seen_index.held_by_others(items, self)
+                ))
+                pending.extend(to_send)
+
+                while len(pending) >= self.batch_size:
+                    batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                    send_queue.put((batch, self.format_records(batch)))
+            except Exception as e:
+                logger.error(f"处理内容时出错: {str(e)}")
+
+        if pending:
+            try:
+                send_queue.put((pending, self.format_records(pending)))
+            except Exception as e:
+                logger.error(f"处理内容时出错: {str(e)}")
+        for _ in range(self.senders):
+            send_queue.put(_DONE)
+
+    def _send(self, send_queue):
+        """发送批次并记录写入成功的内容"""
+        while True:
+            batch = send_queue.get()
+            if batch is _DONE:
+                break
+            items, records = batch
+            if not self.send_records:
+                continue
+            try:
+                if self.record_keys:
+                    report = self.send_records(records, [self.record_keys(item) for item in items])
+                else:
+                    report = self.send_records(records)
+                self._count(sent=report["sent"], failed=report["failed"])
+                unknown = report.get("unknown", [])
+                if unknown:
+                    self._count(unknown=len(unknown))
+                    logger.warning(f"{len(unknown)}条记录无法确认是否已写入飞书，记为已发送不再重发，"
+                                   f"请在多维表格中核对: "
+                                   + ', '.join(f"{items[i].get('platform', '')}:{items[i].get('username', '')}"
+                                               f"@{items[i].get('timestamp', '')}" for i in unknown[:20]))
+                # 结果未知的记录可能已经写入，与写入成功的一样处理，重发会产生重复行
+                delivered = sorted(set(report["succeeded"]) | set(unknown))
+                if self.seen_index:
+                    # 只记录已写入(或可能已写入)的内容，失败的放弃认领，下次运行会重新发送
+                    self.seen_index.mark([items[i] for i in delivered])
+                    if len(delivered) < len(items):
+                        delivered_set = set(delivered)
+                        self.seen_index.release([item for i, item in enumerate(items) if i not in delivered_set])
+                if self.on_sent and delivered:
+                    try:
+                        self.on_sent([items[i] for i in delivered])
+                    except Exception as e:
+                        logger.error(f"登记已发送内容时出错: {str(e)}")
+                self._settle(items, delivered)
+            except Exception as e:
+                logger.error(f"发送批次时出错: {str(e)}")
+                self._count(failed=len(records))
+                if self.seen_index:
+                    self.seen_index.release(items)
+                self._settle(items, [])
+
+    def _apply_links(self):
+        """补写待更新的关联来源，代表记录尚未写入(仍在发送)的留到下次"""
+        try:
+            pending = self.near_dup.pending_links()
+            if pending:
+                self.near_dup.mark_links_applied(self.update_links(pending))
+        except Exception as e:
+            logger.error(f"补写关联来源时出错: {str(e)}")
+
+    def _track(self, items, to_send, deferred=False):
+        """登记列表中待发送的内容，没有需要发送的内容时直接回调"""
+        if not self.on_batch_sent or not self.send_records or deferred:
+            return
+        if not to_send:
+            self._notify([items])
+            return
+        tracker = _BatchTracker(items, len(to_send))
+        with self._trackers_lock:
+            for item in to_send:
+                self._trackers[id(item)] = tracker
+
+    def _settle(self, items, succeeded):
+        """按发送结果更新所属列表的完成情况，回调全部发送成功的列表"""
+        if not self.on_batch_sent:
+            return
+        succeeded = set(succeeded)
+        completed = []
+        with self._trackers_lock:
+            for index, item in enumerate(items):
+                tracker = self._trackers.pop(id(item), None)
+                if tracker is None:
+                    continue
+                if index in succeeded:
+                    tracker.remaining -= 1
+                else:
+                    tracker.failed = True
+                if tracker.remaining == 0 and not tracker.failed:
+                    completed.append(tracker.items)
+        self._notify(completed)
+
+    def _notify(self, batches):
+        for items in batches:
+            try:
+                self.on_batch_sent(items)
+            except Exception as e:
+                logger.error(f"处理发送完成回调时出错: {str(e)}")
+
+    def run(self, item_batches):
+        """消费每个账号产出的内容列表，返回处理统计"""
+        item_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        send_queue = queue.Queue(maxsize=max(2, self.senders))
+
+        threads = [threading.Thread(target=self._process, args=(item_queue, send_queue), daemon=True)]
+        threads += [
+            threading.Thread(target=self._send, args=(send_queue,), daemon=True)
+            for _ in range(self.senders)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for items in item_batches:
+                if items:
+                    self._count(collected=len(items))
+                    item_queue.put(items)
+        finally:
+            item_queue.put(_DONE)
+            for thread in threads:
+                thread.join()
+            if self.near_dup and self.update_links:
+                # 本次运行中发送的代表记录此时都已写入，补写之前未能更新的来源
+                self._apply_links()
+            if self.seen_index:
+                # 处理出错、模拟模式等未发送的帖子在运行结束时放弃认领
+                self.seen_index.release(owner=self)
+            if self.backup:
+                self.backup.close()
+
+        return self.stats
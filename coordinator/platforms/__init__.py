@@ -0,0 +1,45 @@
+import os
+import logging
+import importlib
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 平台插件注册表：平台标识 → 插件模块路径
+# 插件模块只在首次用到该平台时导入，启动时只加载有配置账号的平台
+PLATFORM_MODULES = {
+    'twitter': 'platforms.twitter',
+    'xiaohongshu': 'platforms.xiaohongshu'
+}
+
+# 额外的平台插件，格式: weibo:my_plugins.weibo,douyin:my_plugins.douyin
+PLATFORM_PLUGINS = os.getenv('PLATFORM_PLUGINS', '')
+
+_loaded = {}
+_lock = threading.Lock()
+
+def register_platform(key, module_path):
+    """注册平台插件模块，模块需提供PLATFORM(Platform实例)"""
+    PLATFORM_MODULES[key] = module_path
+    _loaded.pop(key, None)
+
+def supported_platforms():
+    return list(PLATFORM_MODULES)
+
+def get_platform(key):
+    """按平台标识获取插件，未注册的平台返回None"""
+    plugin = _loaded.get(key)
+    if plugin is not None:
+        return plugin
+    module_path = PLATFORM_MODULES.get(key)
+    if module_path is None:
+        return None
+    with _lock:
+        if key not in _loaded:
+            _loaded[key] = importlib.import_module(module_path).PLATFORM
+        return _loaded[key]
+
+for _entry in PLATFORM_PLUGINS.split(','):
+    if ':' in _entry:
+        _key, _module_path = _entry.split(':', 1)
+        register_platform(_key.strip(), _module_path.strip())
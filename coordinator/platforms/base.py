@@ -0,0 +1,58 @@
+def convert_stat_to_number(text):
+    """将形如'1.2K'、'3.5万'的文本转换为数字"""
+    try:
+        if not text:
+            return 0
+        text = text.strip().lower()
+        if 'k' in text:
+            return int(float(text.replace('k', '')) * 1000)
+        if 'm' in text:
+            return int(float(text.replace('m', '')) * 1000000)
+        if 'w' in text or '万' in text:  # 处理中文的"万"
+            text = text.replace('w', '').replace('万', '')
+            return int(float(text) * 10000)
+        return int(text) if text else 0
+    except:
+        return 0
+
+class Platform:
+    """平台插件接口
+
+    每个平台提供抓取URL、抓取工具的选择器、HTML提取函数，
+    以及飞书记录中(点赞, 评论, 转发)和互动总量的计算方式。
+    """
+
+    key = None
+    # 飞书记录中的平台名称
+    name = None
+    # 日志中的平台名称和内容名称
+    label = None
+    item_name = '内容'
+    base_url = None
+    # 传给web-scraper-mcp的选择器
+    selector = None
+    # (点赞, 评论, 转发)对应的内容字段，None表示该平台没有此数据
+    engagement_fields = ('likes', 'comments', 'shares')
+    # 提取逻辑修改后递增，使页面缓存中未变化的页面也重新解析一次
+    extractor_version = 1
+
+    def profile_url(self, username):
+        return f"{self.base_url}{username}"
+
+    def scrape_parameters(self, username, cursor=None):
+        """抓取工具的调用参数，cursor为上一页结果中的next_cursor"""
+        parameters = {"url": self.profile_url(username), "selector": self.selector}
+        if cursor:
+            parameters["cursor"] = cursor
+        return parameters
+
+    def extract(self, html_content, username, backend=None, limit=10):
+        """从个人主页HTML中提取内容列表，limit为None时提取页面上的全部内容"""
+        raise NotImplementedError
+
+    def engagement(self, item):
+        """将内容的互动字段映射为(点赞, 评论, 转发)"""
+        return tuple(item.get(field, 0) if field else 0 for field in self.engagement_fields)
+
+    def interaction_total(self, item):
+        return sum(self.engagement(item))
@@ -0,0 +1,69 @@
+import logging
+from datetime import datetime
+
+from html_parser import get_backend
+from platforms.base import Platform, convert_stat_to_number
+
+logger = logging.getLogger(__name__)
+
+class TwitterPlatform(Platform):
+    key = 'twitter'
+    name = 'Twitter/X'
+    label = 'Twitter'
+    item_name = '推文'
+    base_url = 'https://twitter.com/'
+    selector = 'article'  # Twitter帖子选择器
+    engagement_fields = ('likes', 'replies', 'retweets')
+
+    def extract(self, html_content, username, backend=None, limit=10):
+        """从HTML中提取推文信息"""
+        tweets = []
+        backend = backend or get_backend()
+        doc = backend.parse(html_content)
+    
+        # Twitter文章元素
+        tweet_elements = backend.select(doc, 'tweet')
+    
+        for element in tweet_elements[:limit]:  # 默认获取最新的10条，回填时取整页
+            try:
+                # 提取推文内容
+                content_element = backend.select_one(element, 'tweet_text')
+                content = backend.text(content_element) if content_element is not None else ""
+            
+                # 提取时间
+                time_element = backend.select_one(element, 'tweet_time')
+                timestamp = (backend.attr(time_element, 'datetime') or "") if time_element is not None else ""
+            
+                # 提取互动数据
+                likes = 0
+                retweets = 0
+                replies = 0
+            
+                stat_elements = backend.select(element, 'tweet_stats')
+                for stat in stat_elements:
+                    text = backend.text(stat).strip()
+                    testid = backend.attr(stat, 'data-testid')
+                    if 'like' in testid:
+                        likes = convert_stat_to_number(text)
+                    elif 'retweet' in testid:
+                        retweets = convert_stat_to_number(text)
+                    elif 'reply' in testid:
+                        replies = convert_stat_to_number(text)
+            
+                tweets.append({
+                    "content": content,
+                    "timestamp": timestamp or datetime.now().isoformat(),
+                    "likes": likes,
+                    "retweets": retweets,
+                    "replies": replies,
+                    "username": username,
+                    "collected_at": datetime.now().isoformat(),
+                    "platform": "twitter"
+                })
+            except Exception as e:
+                logger.warning(f"提取推文时出错: {str(e)}")
+                continue
+    
+        return tweets
+
+PLATFORM = TwitterPlatform()
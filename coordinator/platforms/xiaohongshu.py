@@ -0,0 +1,91 @@
+import logging
+from datetime import datetime, timedelta
+
+from html_parser import get_backend
+from platforms.base import Platform, convert_stat_to_number
+
+logger = logging.getLogger(__name__)
+
+class XiaohongshuPlatform(Platform):
+    key = 'xiaohongshu'
+    name = '小红书'
+    label = '小红书'
+    item_name = '笔记'
+    base_url = 'https://www.xiaohongshu.com/user/profile/'
+    selector = '.note-item'  # 小红书笔记选择器
+    # 小红书一般不显示分享数，互动总量只计点赞和评论
+    engagement_fields = ('likes', 'comments', None)
+
+    def extract(self, html_content, username, backend=None, limit=10):
+        """从HTML中提取小红书笔记信息"""
+        notes = []
+        backend = backend or get_backend()
+        doc = backend.parse(html_content)
+    
+        # 小红书笔记元素
+        note_elements = backend.select(doc, 'note')
+    
+        for element in note_elements[:limit]:  # 默认获取最新的10条，回填时取整页
+            try:
+                # 提取笔记内容
+                title_element = backend.select_one(element, 'note_title')
+                title = backend.text(title_element).strip() if title_element is not None else ""
+            
+                desc_element = backend.select_one(element, 'note_desc')
+                desc = backend.text(desc_element).strip() if desc_element is not None else ""
+            
+                content = f"{title}\n{desc}" if desc else title
+            
+                # 提取时间
+                time_element = backend.select_one(element, 'note_time')
+                timestamp = backend.text(time_element).strip() if time_element is not None else ""
+                if timestamp:
+                    try:
+                        # 解析时间格式
+                        if '分钟前' in timestamp:
+                            minutes = int(timestamp.replace('分钟前', '').strip())
+                            timestamp = (datetime.now().replace(microsecond=0) - timedelta(minutes=minutes)).isoformat()
+                        elif '小时前' in timestamp:
+                            hours = int(timestamp.replace('小时前', '').strip())
+                            timestamp = (datetime.now().replace(microsecond=0) - timedelta(hours=hours)).isoformat()
+                        elif '天前' in timestamp:
+                            days = int(timestamp.replace('天前', '').strip())
+                            timestamp = (datetime.now().replace(microsecond=0) - timedelta(days=days)).isoformat()
+                        else:
+                            # 直接解析日期
+                            timestamp = datetime.strptime(timestamp, '%Y-%m-%d').isoformat()
+                    except Exception as e:
+                        logger.warning(f"解析小红书时间戳出错: {str(e)}")
+                        timestamp = datetime.now().isoformat()
+                else:
+                    timestamp = datetime.now().isoformat()
+            
+                # 提取互动数据
+                likes = 0
+                comments = 0
+            
+                like_element = backend.select_one(element, 'note_likes')
+                if like_element is not None:
+                    likes = convert_stat_to_number(backend.text(like_element).strip())
+            
+                comment_element = backend.select_one(element, 'note_comments')
+                if comment_element is not None:
+                    comments = convert_stat_to_number(backend.text(comment_element).strip())
+            
+                notes.append({
+                    "content": content,
+                    "timestamp": timestamp,
+                    "likes": likes,
+                    "comments": comments,
+                    "shares": 0,  # 小红书一般不显示分享数
+                    "username": username,
+                    "collected_at": datetime.now().isoformat(),
+                    "platform": "xiaohongshu"
+                })
+            except Exception as e:
+                logger.warning(f"提取小红书笔记时出错: {str(e)}")
+                continue
+    
+        return notes
+
+PLATFORM = XiaohongshuPlatform()
@@ -0,0 +1,135 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 每个平台的最大请求速率(次/秒)，RATE_LIMIT_<平台>按平台覆盖，如RATE_LIMIT_TWITTER=0.5
+RATE_LIMIT_DEFAULT = float(os.getenv('RATE_LIMIT_DEFAULT', '1.0'))
+# 令牌桶容量，允许的短时突发请求数
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', '3'))
+# 自适应降速的下限(次/秒)
+RATE_LIMIT_MIN = float(os.getenv('RATE_LIMIT_MIN', '0.05'))
+# 后台任务(历史回填)获取令牌时为常规抓取保留的令牌数
+RATE_LIMIT_BACKGROUND_RESERVE = float(os.getenv('RATE_LIMIT_BACKGROUND_RESERVE', '1'))
+
+# 失败时速率乘以该系数；成功时每次恢复最大速率的该比例(加性增、乘性减)
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_STEP = 0.05
+
+def platform_rate_limit(platform):
+    """获取平台的最大请求速率(次/秒)"""
+    return float(os.getenv(f"RATE_LIMIT_{platform.upper()}", RATE_LIMIT_DEFAULT))
+
+class AdaptiveTokenBucket:
+    """自适应令牌桶
+
+    请求成功时速率逐步回升到上限，失败(非200、空页面、429)时速率减半，
+    服务端给出Retry-After时在该时间内暂停发放令牌。
+    """
+
+    def __init__(self, max_rate, burst=RATE_LIMIT_BURST, min_rate=RATE_LIMIT_MIN):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.burst = burst
+        self.rate = max_rate
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时预约下一个令牌并等待，返回等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait_seconds = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        return wait_seconds
+
+    def try_acquire(self, reserve=0):
+        """令牌数多于reserve时取走一个令牌并返回True，否则不等待直接返回False
+
+        常规抓取预约令牌会让令牌数变为负数，此时后台任务一直取不到令牌，
+        只有常规抓取没有排队、令牌积攒到reserve以上时才轮到后台任务。
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1 + min(reserve, self.burst - 1):
+                return False
+            self._tokens -= 1
+            return True
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_INCREASE_STEP)
+
+    def on_failure(self, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # 并发请求可能同时失败，同一个速率周期内只降速一次
+            if now - self._last_decrease >= 1 / self.rate:
+                self.rate = max(self.min_rate, self.rate * RATE_DECREASE_FACTOR)
+                self._last_decrease = now
+            # 清空积攒的令牌，避免降速后仍有一波突发请求
+            self._tokens = min(self._tokens, 0)
+            if retry_after:
+                self._tokens = min(self._tokens, -retry_after * self.rate)
+
+class RateLimiter:
+    """按平台划分的限速器"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, platform):
+        bucket = self._buckets.get(platform)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(platform, AdaptiveTokenBucket(platform_rate_limit(platform)))
+        return bucket
+
+    def acquire(self, platform):
+        """等待直到可以向该平台发出下一个请求"""
+        waited = self.bucket(platform).acquire()
+        if waited > 1:
+            logger.debug(f"{platform}请求限速，等待{waited:.1f}秒")
+
+    def acquire_background(self, platform, stop_event=None, reserve=None):
+        """以低优先级等待令牌，不与常规抓取争抢；stop_event被设置时返回False"""
+        bucket = self.bucket(platform)
+        reserve = RATE_LIMIT_BACKGROUND_RESERVE if reserve is None else reserve
+        while not bucket.try_acquire(reserve):
+            interval = max(0.05, 1 / bucket.rate)
+            if stop_event is not None:
+                if stop_event.wait(interval):
+                    return False
+            else:
+                time.sleep(interval)
+        return True
+
+    def on_success(self, platform):
+        self.bucket(platform).on_success()
+
+    def on_failure(self, platform, retry_after=None):
+        bucket = self.bucket(platform)
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        bucket.on_failure(retry_after)
+        logger.warning(f"{platform}请求失败，速率降至{bucket.rate:.2f}次/秒")
+
+rate_limiter = RateLimiter()
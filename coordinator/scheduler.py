@@ -0,0 +1,125 @@
+import os
+import time
+import heapq
+import logging
+import itertools
+
+logger = logging.getLogger(__name__)
+
+# 默认抓取间隔(秒)，可用SCRAPE_INTERVAL_<平台>按平台覆盖，如SCRAPE_INTERVAL_TWITTER=900
+SCRAPE_INTERVAL = int(os.getenv('SCRAPE_INTERVAL', '3600'))
+
+# 账号优先级，格式: twitter:OpenAI:high,xiaohongshu:AI博主:low，未配置的账号为normal
+ACCOUNT_PRIORITIES = os.getenv('ACCOUNT_PRIORITIES', '')
+
+# 优先级对应的抓取间隔倍数
+PRIORITY_FACTORS = {
+    'high': 0.5,
+    'normal': 1.0,
+    'low': 2.0
+}
+
+def platform_interval(platform):
+    """获取平台的抓取间隔(秒)"""
+    return int(os.getenv(f"SCRAPE_INTERVAL_{platform.upper()}", SCRAPE_INTERVAL))
+
+def parse_account_priorities(value=None):
+    """解析账号优先级配置，返回{(平台, 账号): 优先级}"""
+    value = ACCOUNT_PRIORITIES if value is None else value
+    priorities = {}
+    for entry in value.split(','):
+        parts = entry.strip().rsplit(':', 1)
+        if len(parts) != 2 or ':' not in parts[0]:
+            continue
+        account, priority = parts
+        platform, username = account.split(':', 1)
+        if priority not in PRIORITY_FACTORS:
+            logger.warning(f"无效的账号优先级: {entry}")
+            continue
+        priorities[(platform, username)] = priority
+    return priorities
+
+class AccountScheduler:
+    """按账号独立间隔调度抓取
+
+    每个账号的间隔 = 平台间隔 × 优先级倍数。首轮抓取时间在各自间隔内均匀错开，
+    之后按固定节奏推进，避免所有账号同时请求web-scraper-mcp。
+    """
+
+    def __init__(self, target_accounts, priorities=None, now=None):
+        self.priorities = parse_account_priorities() if priorities is None else priorities
+        self._heap = []
+        # 账号 -> 当前有效的堆条目序号，移除或重新加入后旧条目在出堆时丢弃
+        self._entries = {}
+        self._counter = itertools.count()
+        now = time.time() if now is None else now
+
+        for platform, accounts in target_accounts.items():
+            for index, username in enumerate(accounts):
+                offset = self.interval(platform, username) * index / len(accounts)
+                self.add(platform, username, due=now + offset)
+
+    def interval(self, platform, username):
+        priority = self.priorities.get((platform, username), 'normal')
+        return platform_interval(platform) * PRIORITY_FACTORS[priority]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, account):
+        return account in self._entries
+
+    def _push(self, due, platform, username):
+        seq = next(self._counter)
+        self._entries[(platform, username)] = seq
+        heapq.heappush(self._heap, (due, seq, platform, username))
+
+    def _is_current(self, entry):
+        return self._entries.get((entry[2], entry[3])) == entry[1]
+
+    def add(self, platform, username, due=None):
+        """加入账号，默认立即到期"""
+        if (platform, username) in self._entries:
+            return
+        self._push(time.time() if due is None else due, platform, username)
+
+    def remove(self, platform, username):
+        """移除账号"""
+        self._entries.pop((platform, username), None)
+
+    def sync(self, target_accounts):
+        """与新的账号列表对齐：加入新账号(立即到期)、移除不再负责的账号，返回(新增数, 移除数)"""
+        wanted = {(platform, username) for platform, accounts in target_accounts.items() for username in accounts}
+        current = set(self._entries)
+        for platform, username in wanted - current:
+            self.add(platform, username)
+        for platform, username in current - wanted:
+            self.remove(platform, username)
+        return len(wanted - current), len(current - wanted)
+
+    def pop_due(self, now=None):
+        """取出所有已到期的账号并安排下一次抓取，返回{平台: [账号]}"""
+        now = time.time() if now is None else now
+        due_accounts = {}
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._is_current(entry):
+                continue
+            due, _, platform, username = entry
+            due_accounts.setdefault(platform, []).append(username)
+
+            # 按原定节奏推进；若已落后超过一个间隔则从当前时间重新计算
+            next_due = due + self.interval(platform, username)
+            if next_due <= now:
+                next_due = now + self.interval(platform, username)
+            self._push(next_due, platform, username)
+        return due_accounts
+
+    def seconds_until_next(self, now=None):
+        """距离下一个账号到期的秒数"""
+        now = time.time() if now is None else now
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
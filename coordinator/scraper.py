@@ -1,12 +1,37 @@
 import os
-import requests
 import json
 import logging
 import re
 import argparse
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+import signal
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
 from dotenv import load_dotenv
+import requests
+
+import http_client
+from seen_index import SeenIndex, post_fingerprint, engagement_signature
+from batch_uploader import upload_in_chunks, OutcomeUnknown
+from pipeline import Pipeline
+from backup_store import BackupStore
+from engagement_store import EngagementStore
+from classifier import classify_content
+from scheduler import AccountScheduler
+from tool_cache import ToolCache
+from rate_limiter import rate_limiter
+from metrics import metrics, start_metrics_server, METRICS_PORT
+from platforms import PLATFORM_MODULES, get_platform
+from platforms.base import convert_stat_to_number
+from backfill import Backfill
+from html_cache import HtmlCache, PageItems, HTML_CACHE_ENABLED
+from extract_pool import extract_pool
+from sharding import create_sharder, SHARD_LEASE_PATH
+from near_dup import NearDupIndex, NEAR_DUP_ENABLED
+from account_registry import AccountRegistry, parse_account_settings
+from feishu_client import bitable_writer, token_cache
 
 # 加载环境变量
 load_dotenv()
@@ -25,60 +50,42 @@ logger = logging.getLogger(__name__)
 # 配置
 WEB_SCRAPER_MCP_URL = os.getenv('WEB_SCRAPER_MCP_URL', 'http://localhost:3001')
 FEISHU_MCP_URL = os.getenv('FEISHU_MCP_URL', 'http://localhost:3002')
+# 飞书写入方式：mcp为经feishu-mcp追加记录；direct为直接调用多维表格接口，
+# 互动数据变化的帖子更新原有记录而不是追加新行
+FEISHU_WRITE_MODE = os.getenv('FEISHU_WRITE_MODE', 'mcp').lower()
+# 追加写入(mcp)时互动数据变化的帖子是否再追加一行，默认只在本地更新互动数据，避免重复行
+FEISHU_APPEND_CHANGED = os.getenv('FEISHU_APPEND_CHANGED', '').lower() in ('1', 'true', 'yes')
 
-# 平台配置
-SUPPORTED_PLATFORMS = {
-    'twitter': {
-        'name': 'Twitter/X',
-        'base_url': 'https://twitter.com/'
-    },
-    'xiaohongshu': {
-        'name': '小红书',
-        'base_url': 'https://www.xiaohongshu.com/user/profile/'
-    }
-    # 预留扩展其他平台的位置
-}
+# 并发配置
+SCRAPE_MAX_WORKERS = int(os.getenv('SCRAPE_MAX_WORKERS', '8'))
+# 每个平台的并发上限，格式: twitter:4,xiaohongshu:2
+SCRAPE_PLATFORM_CONCURRENCY = os.getenv('SCRAPE_PLATFORM_CONCURRENCY', '')
+DEFAULT_PLATFORM_CONCURRENCY = 4
+
+# 常驻模式下检查到期账号的最长间隔(秒)
+DAEMON_TICK = float(os.getenv('DAEMON_TICK', '5'))
+
+# 平台配置：平台插件注册表，插件在首次用到时才导入
+SUPPORTED_PLATFORMS = PLATFORM_MODULES
 
 def parse_target_accounts():
-    """解析目标账号配置"""
-    target_accounts = {}
-    
-    # 从TARGET_ACCOUNTS环境变量解析
-    accounts_str = os.getenv('TARGET_ACCOUNTS', '')
-    if accounts_str:
-        for account in accounts_str.split(','):
-            account = account.strip()
-            if ':' in account:
-                platform, username = account.split(':', 1)
-                if platform in SUPPORTED_PLATFORMS:
-                    if platform not in target_accounts:
-                        target_accounts[platform] = []
-                    target_accounts[platform].append(username)
-            else:
-                # 默认为Twitter账号
-                if 'twitter' not in target_accounts:
-                    target_accounts['twitter'] = []
-                target_accounts['twitter'].append(account)
-    
-    # 从平台特定环境变量解析
-    for platform in SUPPORTED_PLATFORMS.keys():
-        env_var = f"{platform.upper()}_ACCOUNTS"
-        accounts_str = os.getenv(env_var, '')
-        if accounts_str:
-            accounts = [account.strip() for account in accounts_str.split(',') if account.strip()]
-            if platform not in target_accounts:
-                target_accounts[platform] = []
-            target_accounts[platform].extend(accounts)
-    
-    return target_accounts
+    """读取目标账号：以账号注册表为准，注册表从未写入过时先导入环境变量中的配置"""
+    registry = AccountRegistry()
+    try:
+        registry.seed(parse_account_settings(os.environ))
+        return registry.accounts()
+    finally:
+        registry.close()
 
-def get_scrape_tool():
-    """获取web-scraper-mcp的抓取工具"""
+def assigned_accounts(sharder=None):
+    """本实例负责的目标账号，未启用分片时为全部账号"""
+    target_accounts = parse_target_accounts()
+    return sharder.assign(target_accounts) if sharder else target_accounts
+
+def discover_scrape_tool():
+    """向web-scraper-mcp查询可用工具，返回其中的网页抓取工具"""
     try:
-        response = requests.post(
-            f"{WEB_SCRAPER_MCP_URL}/tools",
-            json={}
-        )
+        response = http_client.post(WEB_SCRAPER_MCP_URL, "/tools", json={})
         
         tools = response.json().get("tools", [])
         for tool in tools:
@@ -91,261 +98,234 @@ def get_scrape_tool():
         logger.error(f"获取抓取工具时出错: {str(e)}")
         return None
 
-def scrape_twitter_profile(username, scrape_tool):
-    """抓取Twitter个人页面内容"""
-    try:
-        if not scrape_tool:
-            logger.error("抓取工具未初始化")
-            return []
-        
-        # 使用工具抓取Twitter页面
-        operation_id = scrape_tool["operation_id"]
-        response = requests.post(
-            f"{WEB_SCRAPER_MCP_URL}/tools/{operation_id}",
-            json={
-                "parameters": {
-                    "url": f"https://twitter.com/{username}",
-                    "selector": "article" # Twitter帖子选择器
-                }
-            }
-        )
-        
-        if response.status_code != 200:
-            logger.error(f"获取Twitter页面失败: {response.status_code}")
-            return []
-        
-        result = response.json().get("result", {})
-        html_content = result.get("html", "")
-        if not html_content:
-            logger.error("返回的Twitter HTML内容为空")
-            return []
-        
-        # 解析HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        return extract_tweets(soup, username)
-    except Exception as e:
-        logger.error(f"抓取Twitter页面出错: {str(e)}")
-        return []
+tool_cache = ToolCache(discover_scrape_tool)
 
-def extract_tweets(soup, username):
-    """从HTML中提取推文信息"""
-    tweets = []
+def get_scrape_tool():
+    """获取web-scraper-mcp的抓取工具，优先使用缓存的工具描述"""
+    with metrics.timer('get_scrape_tool'):
+        tool = tool_cache.get()
+    if not tool:
+        metrics.error('get_scrape_tool', 'unavailable')
+    return tool
+
+def log_tool_cache_stats():
+    """输出抓取工具缓存的命中统计"""
+    stats = tool_cache.stats
+    logger.info(f"抓取工具缓存: 命中{stats['hits']}次，过期命中{stats['stale_hits']}次，"
+                f"未命中{stats['misses']}次，刷新失败{stats['refresh_failures']}次")
+
+def fetch_profile_page(platform, username, scrape_tool, cursor=None, background=False, stop_event=None):
+    """通过web-scraper-mcp获取账号个人页面的一页，返回(HTML, 下一页游标)，失败时返回None
     
-    # Twitter文章元素
-    tweet_elements = soup.select('article')
+    background为True时以低优先级获取限速令牌(历史回填)，不与常规抓取争抢。
+    """
+    plugin = get_platform(platform)
+    if not scrape_tool:
+        logger.error("抓取工具未初始化")
+        return None
     
-    for element in tweet_elements[:10]:  # 获取最新的10条
+    operation_id = scrape_tool["operation_id"]
+    mode = 'backfill' if background else None
+    # 由这里而不是http_client重试，每次请求(包括重试)都先取得限速令牌，失败时收紧限速
+    for attempt in range(http_client.HTTP_MAX_RETRIES + 1):
+        if background:
+            if not rate_limiter.acquire_background(platform, stop_event):
+                return None
+        else:
+            rate_limiter.acquire(platform)
         try:
-            # 提取推文内容
-            content_element = element.select_one('div[data-testid="tweetText"]')
-            content = content_element.get_text() if content_element else ""
-            
-            # 提取时间
-            time_element = element.select_one('time')
-            timestamp = time_element['datetime'] if time_element and 'datetime' in time_element.attrs else ""
-            
-            # 提取互动数据
-            likes = 0
-            retweets = 0
-            replies = 0
-            
-            stat_elements = element.select('span[data-testid$="-count"]')
-            for stat in stat_elements:
-                text = stat.get_text().strip()
-                if 'like' in stat['data-testid']:
-                    likes = convert_stat_to_number(text)
-                elif 'retweet' in stat['data-testid']:
-                    retweets = convert_stat_to_number(text)
-                elif 'reply' in stat['data-testid']:
-                    replies = convert_stat_to_number(text)
-            
-            tweets.append({
-                "content": content,
-                "timestamp": timestamp or datetime.now().isoformat(),
-                "likes": likes,
-                "retweets": retweets,
-                "replies": replies,
-                "username": username,
-                "collected_at": datetime.now().isoformat(),
-                "platform": "twitter"
-            })
-        except Exception as e:
-            logger.warning(f"提取推文时出错: {str(e)}")
+            with metrics.timer('scrape', platform=platform, mode=mode):
+                response = http_client.post(
+                    WEB_SCRAPER_MCP_URL,
+                    f"/tools/{operation_id}",
+                    json={"parameters": plugin.scrape_parameters(username, cursor)},
+                    retries=0
+                )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # 超时和连接错误是被限流时最常见的表现
+            rate_limiter.on_failure(platform)
+            if attempt >= http_client.HTTP_MAX_RETRIES:
+                raise
+            logger.warning(f"获取{plugin.label}页面失败({type(e).__name__})，准备第{attempt + 1}次重试")
             continue
+        if response.status_code < 500 or attempt >= http_client.HTTP_MAX_RETRIES:
+            break
+        metrics.error('scrape', f"http_{response.status_code}", platform=platform)
+        rate_limiter.on_failure(platform, retry_after=response.headers.get("Retry-After"))
+        logger.warning(f"获取{plugin.label}页面返回HTTP {response.status_code}，准备第{attempt + 1}次重试")
+    metrics.inc('bytes_received', len(response.content), platform=platform)
+    
+    if response.status_code in (400, 404):
+        # 工具不存在或参数格式已变化：缓存的工具描述已失效，下次获取时重新查询
+        logger.warning(f"抓取工具{operation_id}返回HTTP {response.status_code}，刷新缓存的工具描述")
+        tool_cache.invalidate(scrape_tool)
+    if response.status_code != 200:
+        metrics.error('scrape', f"http_{response.status_code}", platform=platform)
+        rate_limiter.on_failure(platform, retry_after=response.headers.get("Retry-After"))
+        logger.error(f"获取{plugin.label}页面失败: {response.status_code}")
+        return None
     
-    return tweets
+    result = response.json().get("result", {})
+    html_content = result.get("html", "")
+    if not html_content:
+        metrics.error('scrape', 'empty_html', platform=platform)
+        rate_limiter.on_failure(platform)
+        logger.error(f"返回的{plugin.label}HTML内容为空")
+        return None
+    rate_limiter.on_success(platform)
+    return html_content, result.get("next_cursor")
 
-def scrape_xiaohongshu_profile(username, scrape_tool):
-    """抓取小红书个人页面内容"""
+def scrape_profile(platform, username, scrape_tool, html_cache=None, pool=None):
+    """通过web-scraper-mcp抓取账号个人页面并提取内容
+    
+    提供html_cache时，页面与上次成功发送的完全相同(且提取器未更新)则跳过解析，返回空列表；
+    否则返回PageItems，内容发送成功后由管道回调提交页面记录。提供pool时在工作进程中解析。
+    """
+    plugin = get_platform(platform)
     try:
-        if not scrape_tool:
-            logger.error("抓取工具未初始化")
+        page = fetch_profile_page(platform, username, scrape_tool)
+        if page is None:
             return []
         
-        # 使用工具抓取小红书页面
-        operation_id = scrape_tool["operation_id"]
-        response = requests.post(
-            f"{WEB_SCRAPER_MCP_URL}/tools/{operation_id}",
-            json={
-                "parameters": {
-                    "url": f"https://www.xiaohongshu.com/user/profile/{username}",
-                    "selector": ".note-item" # 小红书笔记选择器
-                }
-            }
-        )
-        
-        if response.status_code != 200:
-            logger.error(f"获取小红书页面失败: {response.status_code}")
-            return []
-        
-        result = response.json().get("result", {})
-        html_content = result.get("html", "")
-        if not html_content:
-            logger.error("返回的小红书HTML内容为空")
-            return []
+        digest = None
+        if html_cache:
+            unchanged, digest = page_unchanged(html_cache, plugin, username, page[0])
+            if unchanged:
+                metrics.inc('html_unchanged', platform=platform)
+                logger.info(f"{plugin.label}账号{username}的页面未变化，跳过解析")
+                return []
         
-        # 解析HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        return extract_xiaohongshu_notes(soup, username)
+        with metrics.timer('parse', platform=platform):
+            if pool:
+                items = pool.extract(platform, page[0], username)
+            else:
+                items = plugin.extract(page[0], username)
+        if digest is None:
+            return items
+        return PageItems(items, (platform, username, digest, plugin.extractor_version))
     except Exception as e:
-        logger.error(f"抓取小红书页面出错: {str(e)}")
+        metrics.error('scrape', type(e).__name__, platform=platform)
+        logger.error(f"抓取{plugin.label}页面出错: {str(e)}")
         return []
 
-def extract_xiaohongshu_notes(soup, username):
+def page_unchanged(html_cache, plugin, username, html_content):
+    """保存页面到缓存并判断是否与上次发送的相同，返回(是否相同, 页面哈希)，缓存出错时按有变化处理"""
+    try:
+        return html_cache.check(plugin.key, username, html_content, plugin.extractor_version)
+    except Exception as e:
+        logger.warning(f"页面缓存出错，继续解析: {str(e)}")
+        return False, None
+
+def scrape_twitter_profile(username, scrape_tool):
+    """抓取Twitter个人页面内容"""
+    return scrape_profile('twitter', username, scrape_tool)
+
+def scrape_xiaohongshu_profile(username, scrape_tool):
+    """抓取小红书个人页面内容"""
+    return scrape_profile('xiaohongshu', username, scrape_tool)
+
+def extract_tweets(html_content, username, backend=None):
+    """从HTML中提取推文信息"""
+    return get_platform('twitter').extract(html_content, username, backend)
+
+def extract_xiaohongshu_notes(html_content, username, backend=None):
     """从HTML中提取小红书笔记信息"""
-    notes = []
+    return get_platform('xiaohongshu').extract(html_content, username, backend)
+
+def parse_platform_concurrency(value=None):
+    """解析每个平台的并发上限配置，格式: twitter:4,xiaohongshu:2"""
+    value = SCRAPE_PLATFORM_CONCURRENCY if value is None else value
+    limits = {platform: DEFAULT_PLATFORM_CONCURRENCY for platform in SUPPORTED_PLATFORMS}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if ':' not in entry:
+            continue
+        platform, limit = entry.split(':', 1)
+        try:
+            limits[platform.strip()] = max(1, int(limit))
+        except ValueError:
+            logger.warning(f"无效的平台并发配置: {entry}")
+    return limits
+
+def scrape_account(platform, username, scrape_tool, html_cache=None, pool=None):
+    """抓取单个账号，保持与串行抓取相同的日志输出"""
+    plugin = get_platform(platform)
+    logger.info(f"正在抓取{plugin.label}账号: {username}")
+    start = time.perf_counter()
+    items = scrape_profile(platform, username, scrape_tool, html_cache, pool)
+    metrics.account_seconds(platform, username, time.perf_counter() - start)
+    metrics.inc('items_scraped', len(items), platform=platform)
+    logger.info(f"已获取{len(items)}条{plugin.item_name}")
+    return items
+
+def scrape_accounts(target_accounts, scrape_tool, max_workers=None, platform_limits=None, html_cache=None):
+    """并发抓取所有目标账号，按完成顺序逐个产出每个账号的内容列表
     
-    # 小红书笔记元素
-    note_elements = soup.select('.note-item')
+    全局并发由线程池大小限制，各平台同时在途的请求数不超过platform_limits。
+    """
+    max_workers = max_workers or SCRAPE_MAX_WORKERS
+    platform_limits = platform_limits or parse_platform_concurrency()
     
-    for element in note_elements[:10]:  # 获取最新的10条
-        try:
-            # 提取笔记内容
-            title_element = element.select_one('.title')
-            title = title_element.get_text().strip() if title_element else ""
-            
-            desc_element = element.select_one('.desc')
-            desc = desc_element.get_text().strip() if desc_element else ""
-            
-            content = f"{title}\n{desc}" if desc else title
-            
-            # 提取时间
-            time_element = element.select_one('.time')
-            timestamp = time_element.get_text().strip() if time_element else ""
-            if timestamp:
-                try:
-                    # 解析时间格式
-                    if '分钟前' in timestamp:
-                        minutes = int(timestamp.replace('分钟前', '').strip())
-                        timestamp = (datetime.now().replace(microsecond=0) - timedelta(minutes=minutes)).isoformat()
-                    elif '小时前' in timestamp:
-                        hours = int(timestamp.replace('小时前', '').strip())
-                        timestamp = (datetime.now().replace(microsecond=0) - timedelta(hours=hours)).isoformat()
-                    elif '天前' in timestamp:
-                        days = int(timestamp.replace('天前', '').strip())
-                        timestamp = (datetime.now().replace(microsecond=0) - timedelta(days=days)).isoformat()
-                    else:
-                        # 直接解析日期
-                        timestamp = datetime.strptime(timestamp, '%Y-%m-%d').isoformat()
-                except Exception as e:
-                    logger.warning(f"解析小红书时间戳出错: {str(e)}")
-                    timestamp = datetime.now().isoformat()
-            else:
-                timestamp = datetime.now().isoformat()
-            
-            # 提取互动数据
-            likes = 0
-            comments = 0
-            
-            like_element = element.select_one('.like span')
-            if like_element:
-                likes = convert_stat_to_number(like_element.get_text().strip())
-            
-            comment_element = element.select_one('.comment span')
-            if comment_element:
-                comments = convert_stat_to_number(comment_element.get_text().strip())
-            
-            notes.append({
-                "content": content,
-                "timestamp": timestamp,
-                "likes": likes,
-                "comments": comments,
-                "shares": 0,  # 小红书一般不显示分享数
-                "username": username,
-                "collected_at": datetime.now().isoformat(),
-                "platform": "xiaohongshu"
-            })
-        except Exception as e:
-            logger.warning(f"提取小红书笔记时出错: {str(e)}")
+    # 账号较多时在多个进程中解析页面，少量账号直接在抓取线程中解析
+    account_count = sum(len(accounts) for accounts in target_accounts.values())
+    pool = extract_pool if extract_pool.enabled_for(account_count) else None
+    
+    # 每个平台一个待抓取队列
+    queues = {}
+    for platform, accounts in target_accounts.items():
+        # 只导入有配置账号的平台插件
+        plugin = get_platform(platform) if accounts else None
+        if plugin is None:
             continue
+        logger.info(f"开始抓取{len(accounts)}个{plugin.label}账号")
+        queues[platform] = deque(accounts)
     
-    return notes
-
-def convert_stat_to_number(text):
-    """将形如'1.2K'、'3.5万'的文本转换为数字"""
-    try:
-        if not text:
-            return 0
-        text = text.strip().lower()
-        if 'k' in text:
-            return int(float(text.replace('k', '')) * 1000)
-        if 'm' in text:
-            return int(float(text.replace('m', '')) * 1000000)
-        if 'w' in text or '万' in text:  # 处理中文的"万"
-            text = text.replace('w', '').replace('万', '')
-            return int(float(text) * 10000)
-        return int(text) if text else 0
-    except:
-        return 0
+    in_flight = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next(platform):
+            username = queues[platform].popleft()
+            future = executor.submit(scrape_account, platform, username, scrape_tool, html_cache, pool)
+            in_flight[future] = (platform, username)
+        
+        for platform, queue in queues.items():
+            for _ in range(min(platform_limits.get(platform, DEFAULT_PLATFORM_CONCURRENCY), len(queue))):
+                submit_next(platform)
+        
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                platform, username = in_flight.pop(future)
+                if queues[platform]:
+                    submit_next(platform)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"抓取账号{platform}:{username}出错: {str(e)}")
 
 def format_for_feishu(items):
     """将多平台内容数据格式化为飞书多维表格格式"""
+    with metrics.timer('format'):
+        records = _format_records(items)
+    metrics.inc('records_formatted', len(records))
+    return records
+
+def _format_records(items):
     records = []
     
     for item in items:
         platform = item.get("platform", "未知平台")
+        plugin = get_platform(platform)
         
-        # 计算互动总量
-        interaction_total = 0
-        
-        # 根据不同平台计算互动总量
-        if platform == "twitter":
-            interaction_total = item.get("likes", 0) + item.get("retweets", 0) + item.get("replies", 0)
-        elif platform == "xiaohongshu":
-            interaction_total = item.get("likes", 0) + item.get("comments", 0)
-        
-        # 内容分类逻辑
-        content_type = []
-        content = item.get("content", "").lower()
-        
-        # 通用关键词匹配
-        if any(word in content for word in ["发布", "推出", "新品", "发售", "上线"]):
-            content_type.append("产品宣传")
-        if any(word in content for word in ["活动", "直播", "预告", "抽奖", "揭晓"]):
-            content_type.append("活动通知")
-        if any(word in content for word in ["谢谢", "感谢", "我们", "用户", "粉丝"]):
-            content_type.append("用户互动")
-        
-        # AI相关内容识别
-        if any(word in content for word in ["ai", "人工智能", "机器学习", "深度学习", "神经网络", "大语言模型", "llm", "gpt"]):
-            content_type.append("AI相关")
-        
-        # 如果没有匹配到类型，则标记为"其他"
-        if not content_type:
-            content_type.append("其他")
-        
-        # 根据不同平台映射互动数据
-        likes = 0
-        comments = 0
-        shares = 0
+        # 按平台插件映射互动数据和计算互动总量
+        if plugin is not None:
+            likes, comments, shares = plugin.engagement(item)
+            interaction_total = plugin.interaction_total(item)
+        else:
+            likes = comments = shares = interaction_total = 0
         
-        if platform == "twitter":
-            likes = item.get("likes", 0)
-            comments = item.get("replies", 0)
-            shares = item.get("retweets", 0)
-        elif platform == "xiaohongshu":
-            likes = item.get("likes", 0)
-            comments = item.get("comments", 0)
+        # 内容分类：所有类别的关键词编译为一个匹配器，一次扫描完成分类
+        content_type = classify_content(item.get("content", ""))
         
         # 创建飞书记录
         records.append({
@@ -356,48 +336,99 @@ def format_for_feishu(items):
                 "点赞数": likes,
                 "评论数": comments,
                 "转发数": shares,
-                "平台": get_platform_display_name(platform),
+                "平台": plugin.name if plugin is not None else platform,
                 "收集时间": item.get("collected_at", datetime.now().isoformat()),
                 "互动总量": interaction_total,
                 "内容类型": content_type,
                 "敏感度": "低"  # 默认值，后续可人工修改
             }
         })
+        
+        # 开启FEISHU_ENGAGEMENT_DELTAS时附加批量计算的24小时互动增长
+        if "engagement_growth_24h" in item:
+            records[-1]["fields"]["24小时互动增长"] = item["engagement_growth_24h"]
+            records[-1]["fields"]["互动增速(每小时)"] = item["engagement_velocity_24h"]
+        
+        # 开启NEAR_DUP_ENABLED时附加被合并的近似重复内容的来源
+        if item.get("linked_sources"):
+            records[-1]["fields"]["关联来源"] = format_linked_sources(item["linked_sources"])
     
     return records
 
+def format_linked_sources(sources):
+    """近似重复内容的来源，格式化为"关联来源"字段"""
+    return "，".join(f"{get_platform_display_name(source['platform'])}@{source['username']}" for source in sources)
+
+def update_linked_sources(links):
+    """直接写入模式下把后来发现的转发来源补写到已发送的代表记录，返回已更新的帖子指纹"""
+    return bitable_writer.update_fields(
+        {key: {"关联来源": format_linked_sources(sources)} for key, sources in links.items()}
+    )
+
 def get_platform_display_name(platform_key):
     """获取平台的显示名称"""
-    for key, config in SUPPORTED_PLATFORMS.items():
-        if key == platform_key:
-            return config.get('name', platform_key)
-    return platform_key
+    plugin = get_platform(platform_key)
+    return plugin.name if plugin is not None else platform_key
 
-def send_to_feishu(records):
-    """发送数据到飞书多维表格"""
-    if not records:
-        logger.info("没有数据需要发送")
-        return
-        
+def send_records_chunk(records):
+    """通过feishu-mcp写入一个分块的记录，返回是否成功"""
     try:
-        logger.info(f"正在发送{len(records)}条记录到飞书")
-        response = requests.post(
-            f"{FEISHU_MCP_URL}/tools/append_to_bitable",
-            json={
-                "parameters": {
-                    "records": records
-                }
-            }
-        )
-        
-        if response.status_code != 200:
-            logger.error(f"发送到飞书失败: HTTP {response.status_code}")
-            return
-            
-        result = response.json()
-        logger.info(f"发送到飞书结果: {result}")
+        with metrics.timer('send_chunk'):
+            response = http_client.post(
+                FEISHU_MCP_URL,
+                "/tools/append_to_bitable",
+                json={
+                    "parameters": {
+                        "records": records
+                    }
+                },
+                idempotent=False
+            )
     except Exception as e:
-        logger.error(f"发送到飞书出错: {str(e)}")
+        metrics.error('send_chunk', type(e).__name__)
+        raise
+    
+    if response.status_code != 200:
+        metrics.error('send_chunk', f"http_{response.status_code}")
+        logger.error(f"发送到飞书失败: HTTP {response.status_code}")
+        return False
+    
+    result = response.json().get("result", {})
+    if result.get("unknown"):
+        # feishu-mcp的请求已发往飞书但没有收到响应，可能已经写入，不能重发
+        metrics.error('send_chunk', 'unknown')
+        raise OutcomeUnknown(result.get('message', '未知错误'))
+    if not result.get("success"):
+        metrics.error('send_chunk', 'rejected')
+        logger.error(f"发送到飞书失败: {result.get('message', '未知错误')}")
+        return False
+    # 飞书以HTTP 200 + 非0错误码拒绝写入，旧版feishu-mcp不检查错误码，这里再确认一次
+    code = (result.get("details") or {}).get("code", 0)
+    if code != 0:
+        metrics.error('send_chunk', 'rejected')
+        logger.error(f"发送到飞书失败: 错误码{code} {(result.get('details') or {}).get('msg', '')}")
+        return False
+    return True
+
+def send_to_feishu(records, keys=None):
+    """分块并行发送数据到飞书多维表格，返回上传报告
+
+    直接写入模式下keys为每条记录对应的帖子指纹，已写入过的帖子更新原有记录。
+    """
+    if not records:
+        logger.info("没有数据需要发送")
+        return {"total": 0, "sent": 0, "failed": 0, "chunks": [], "succeeded": [], "unknown": []}
+    
+    logger.info(f"正在发送{len(records)}条记录到飞书")
+    with metrics.timer('send'):
+        if keys is not None:
+            report = bitable_writer.send(records, keys)
+        else:
+            # 追加记录不是幂等的，超时的分块不重试
+            report = upload_in_chunks(records, send_records_chunk, idempotent=False)
+    metrics.inc('records_sent', report["sent"])
+    metrics.inc('records_failed', report["failed"])
+    return report
 
 def load_mock_data():
     """从模拟数据文件加载数据"""
@@ -434,78 +465,291 @@ def load_mock_data():
         logger.error("模拟数据文件格式无效")
         return []
 
-def main():
-    """主函数"""
-    # 解析命令行参数
-    parser = argparse.ArgumentParser(description='对标账号数据采集工具')
-    parser.add_argument('--test-mode', action='store_true', help='使用测试模式(模拟数据)')
-    parser.add_argument('--mock-only', action='store_true', help='只生成模拟数据，不发送到飞书')
-    args = parser.parse_args()
-    
-    # 确保日志目录存在
-    os.makedirs("coordinator", exist_ok=True)
-    
-    all_items = []
+def publish_sent(sharder, items):
+    """动态分片时把已发送的帖子登记到租约数据库，账号转移后新节点据此去重"""
+    keys = [post_fingerprint(item) for item in items]
+    record_ids = bitable_writer.record_ids(keys) if FEISHU_WRITE_MODE == 'direct' else {}
+    sharder.publish([
+        (item.get("platform", ""), item.get("username", ""), key, engagement_signature(item), record_ids.get(key))
+        for key, item in zip(keys, items)
+    ])
+
+def seed_moved_accounts(sharder, seen_index, accounts):
+    """账号从其他节点转移过来时，先导入原节点已发送的帖子和record_id，再开始抓取"""
+    rows = sharder.sent_posts(accounts)
+    if not rows:
+        return
+    if seen_index:
+        seen_index.seed([(key, counters) for key, counters, _ in rows])
+    if FEISHU_WRITE_MODE == 'direct':
+        bitable_writer.remember([(key, record_id) for key, _, record_id in rows if record_id])
+    logger.info(f"已从其他节点导入{len(accounts)}个账号的{len(rows)}条已发送记录")
+
+def run_pipeline(item_batches, args, seen_index, backup_store, engagement_store, html_cache=None, near_dup=None,
+                 sharder=None):
+    """让抓取结果逐账号流入管道：备份和记录互动样本 → 去重 → 格式化 → 分批发送到飞书"""
+    pipeline = Pipeline(
+        format_records=format_for_feishu,
+        send_records=None if args.mock_only else send_to_feishu,
+        seen_index=seen_index,
+        backup=backup_store,
+        engagement=engagement_store,
+        near_dup=near_dup,
+        record_keys=post_fingerprint if FEISHU_WRITE_MODE == 'direct' else None,
+        # 追加写入无法修改已有的行，只有直接写入时才补写代表记录的关联来源
+        update_links=update_linked_sources if FEISHU_WRITE_MODE == 'direct' and not args.mock_only else None,
+        send_changed=FEISHU_WRITE_MODE == 'direct' or FEISHU_APPEND_CHANGED,
+        on_sent=(lambda items: publish_sent(sharder, items)) if sharder else None,
+        # 页面的内容全部发送成功后才记录页面哈希，发送失败或模拟模式下次仍会重新解析
+        on_batch_sent=html_cache.commit_items if html_cache else None
+    )
+    stats = pipeline.run(item_batches)
     
+    if seen_index:
+        logger.info(f"新内容{stats['new']}条，互动数据有变化{stats['changed']}条，"
+                    f"跳过未变化内容{stats['skipped']}条")
+        if stats['changed'] and FEISHU_WRITE_MODE != 'direct' and not FEISHU_APPEND_CHANGED:
+            logger.info("追加写入模式下互动数据有变化的帖子只在本地更新，不再追加到飞书"
+                        "(FEISHU_WRITE_MODE=direct可更新原有记录)")
+    if near_dup:
+        logger.info(f"合并近似重复内容{stats['near_duplicates']}条")
+    return stats
+
+def run_once(args, seen_index, backup_store, engagement_store, html_cache=None, sharder=None, near_dup=None):
+    """单次运行：抓取所有目标账号并处理"""
     if args.test_mode:
         logger.info("使用测试模式，加载模拟数据")
-        all_items = load_mock_data()
-        logger.info(f"已加载{len(all_items)}条模拟数据")
+        mock_items = load_mock_data()
+        logger.info(f"已加载{len(mock_items)}条模拟数据")
+        item_batches = [mock_items]
     else:
-        # 解析目标账号
-        target_accounts = parse_target_accounts()
+        # 解析目标账号(分片时只取本实例负责的部分)
+        target_accounts = assigned_accounts(sharder)
         logger.info(f"已配置的目标账号: {target_accounts}")
         
         # 获取抓取工具
         scrape_tool = get_scrape_tool()
         if not scrape_tool:
             logger.error("无法获取抓取工具，切换到测试模式")
-            all_items = load_mock_data()
+            item_batches = [load_mock_data()]
         else:
-            # 处理Twitter账号
-            if 'twitter' in target_accounts:
-                twitter_accounts = target_accounts['twitter']
-                logger.info(f"开始抓取{len(twitter_accounts)}个Twitter账号")
-                
-                for username in twitter_accounts:
-                    logger.info(f"正在抓取Twitter账号: {username}")
-                    tweets = scrape_twitter_profile(username, scrape_tool)
-                    logger.info(f"已获取{len(tweets)}条推文")
-                    all_items.extend(tweets)
-            
-            # 处理小红书账号
-            if 'xiaohongshu' in target_accounts:
-                xiaohongshu_accounts = target_accounts['xiaohongshu']
-                logger.info(f"开始抓取{len(xiaohongshu_accounts)}个小红书账号")
-                
-                for username in xiaohongshu_accounts:
-                    logger.info(f"正在抓取小红书账号: {username}")
-                    notes = scrape_xiaohongshu_profile(username, scrape_tool)
-                    logger.info(f"已获取{len(notes)}条笔记")
-                    all_items.extend(notes)
+            item_batches = scrape_accounts(target_accounts, scrape_tool, max_workers=args.max_workers,
+                                           html_cache=html_cache)
+    
+    stats = run_pipeline(item_batches, args, seen_index, backup_store, engagement_store, html_cache, near_dup)
     
-    # 数据存储和发送
-    if all_items:
-        # 格式化数据并发送到飞书
-        feishu_records = format_for_feishu(all_items)
+    if stats["collected"]:
+        logger.info(f"成功收集和处理了{stats['collected']}条内容")
+    else:
+        logger.warning("未获取到任何内容")
+    
+    if not args.test_mode:
+        log_tool_cache_stats()
+    metrics.write_summary()
+
+def extract_page(platform, html_content, username):
+    """回填时提取整页内容，不限条数"""
+    try:
+        with metrics.timer('parse', platform=platform, mode='backfill'):
+            return get_platform(platform).extract(html_content, username, limit=None)
+    except Exception as e:
+        metrics.error('parse', type(e).__name__, platform=platform, mode='backfill')
+        logger.error(f"提取回填页面出错: {str(e)}")
+        return []
+
+def fetch_backfill_page(platform, username, cursor, stop_event=None):
+    """以低优先级获取回填的一页，不与常规抓取争抢限速令牌"""
+    try:
+        return fetch_profile_page(platform, username, get_scrape_tool(), cursor,
+                                  background=True, stop_event=stop_event)
+    except Exception as e:
+        metrics.error('scrape', type(e).__name__, platform=platform, mode='backfill')
+        logger.error(f"获取回填页面出错: {str(e)}")
+        return None
+
+def run_backfill(args, seen_index, backup_store, engagement_store, stop_event=None, html_cache=None, sharder=None,
+                 near_dup=None):
+    """历史回填：沿分页抓取目标账号的历史内容，送入与常规抓取相同的管道"""
+    backfill = Backfill(
+        fetch_backfill_page,
+        extract_page,
+        seen_index=seen_index,
+        since=args.backfill_since,
+        stop_at_seen=not args.backfill_deep,
+        restart=args.backfill_restart
+    )
+    logger.info(f"开始历史回填，截止日期{backfill.since}")
+    return run_pipeline(backfill.run(assigned_accounts(sharder), stop_event), args, seen_index, backup_store,
+                        engagement_store, html_cache, near_dup, sharder)
+
+def run_reparse(args, seen_index, backup_store, engagement_store, html_cache, near_dup=None):
+    """用当前的提取器重新解析缓存的原始页面(修复提取器后使用)"""
+    def item_batches():
+        for platform, username, html_content in html_cache.iter_pages():
+            plugin = get_platform(platform)
+            if plugin is None:
+                continue
+            try:
+                yield plugin.extract(html_content, username)
+            except Exception as e:
+                logger.error(f"重新解析{platform}:{username}的缓存页面出错: {str(e)}")
+    
+    stats = run_pipeline(item_batches(), args, seen_index, backup_store, engagement_store, html_cache, near_dup)
+    logger.info(f"重新解析缓存页面得到{stats['collected']}条内容")
+    return stats
+
+def run_daemon(args, seen_index, backup_store, engagement_store, html_cache=None, sharder=None, near_dup=None):
+    """常驻模式：按账号调度周期性抓取，跨周期复用抓取工具缓存、连接池、去重索引和备份存储"""
+    stop_event = threading.Event()
+    
+    def handle_signal(signum, frame):
+        logger.info("收到退出信号，当前周期结束后退出")
+        stop_event.set()
+    
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    
+    metrics_server = start_metrics_server(metrics) if METRICS_PORT else None
+    
+    # 账号注册表的变更增量调度：新增账号立即到期，移除的账号不再抓取，其余账号的节奏不受影响
+    all_accounts = parse_target_accounts()
+    registry = AccountRegistry()
+    registry_version = registry.version()
+    owned_accounts = sharder.assign(all_accounts) if sharder else all_accounts
+    if sharder:
+        # 节点加入时接管的账号可能已由其他节点发送过
+        seed_moved_accounts(sharder, seen_index, [(platform, username) for platform, accounts in owned_accounts.items()
+                                                  for username in accounts])
+    scheduler = AccountScheduler(owned_accounts)
+    logger.info(f"常驻模式启动，已调度{len(scheduler)}个账号")
+    
+    # 历史回填在后台线程中运行，限速时让位于常规抓取
+    backfill_thread = None
+    if args.backfill:
+        backfill_thread = threading.Thread(
+            target=run_backfill,
+            args=(args, seen_index, backup_store, engagement_store, stop_event, html_cache, sharder, near_dup),
+            daemon=True
+        )
+        backfill_thread.start()
+    
+    while not stop_event.is_set():
+        # 每轮只比较最新版本号，有变化时才读取变更记录
+        if registry.version() != registry_version:
+            registry_version, added, removed = registry.changes_since(registry_version)
+            all_accounts = registry.accounts()
+            for platform, username in added:
+                if not sharder or sharder.owns(platform, username):
+                    scheduler.add(platform, username)
+            for platform, username in removed:
+                scheduler.remove(platform, username)
+            logger.info(f"目标账号已更新(版本{registry_version}): 新增{len(added)}个，移除{len(removed)}个")
         
-        if not args.mock_only:
-            send_to_feishu(feishu_records)
-        else:
-            logger.info("模拟模式：跳过发送到飞书的步骤")
+        # 动态分片时存活节点变化(有节点加入或宕机)，重新分配本实例负责的账号
+        if sharder and sharder.refresh():
+            owned_accounts = sharder.assign(all_accounts)
+            seed_moved_accounts(sharder, seen_index, [(platform, username) for platform, accounts in owned_accounts.items()
+                                                      for username in accounts if (platform, username) not in scheduler])
+            added, removed = scheduler.sync(owned_accounts)
+            logger.info(f"{sharder.describe()}: 新增{added}个账号，移除{removed}个账号")
         
-        # 保存到本地文件作为备份
-        backup_dir = "coordinator/backup"
-        os.makedirs(backup_dir, exist_ok=True)
-        backup_file = f"{backup_dir}/social_media_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        # 每轮从缓存取工具(过期时后台刷新)；不可用时不消耗到期账号，等待下一次检查
+        scrape_tool = get_scrape_tool()
+        if not scrape_tool:
+            logger.error(f"无法获取抓取工具，{DAEMON_TICK}秒后重试")
+            stop_event.wait(DAEMON_TICK)
+            continue
         
-        with open(backup_file, 'w', encoding='utf-8') as f:
-            json.dump(all_items, f, ensure_ascii=False, indent=2)
-            logger.info(f"备份数据保存到: {backup_file}")
+        due_accounts = scheduler.pop_due()
+        if due_accounts:
+            logger.info(f"本轮到期账号: {due_accounts}")
+            item_batches = scrape_accounts(due_accounts, scrape_tool, max_workers=args.max_workers, html_cache=html_cache)
+            run_pipeline(item_batches, args, seen_index, backup_store, engagement_store, html_cache, near_dup, sharder)
         
-        logger.info(f"成功收集和处理了{len(all_items)}条内容")
-    else:
-        logger.warning("未获取到任何内容")
+        wait_seconds = scheduler.seconds_until_next()
+        stop_event.wait(DAEMON_TICK if wait_seconds is None else min(DAEMON_TICK, wait_seconds))
+    
+    if backfill_thread:
+        backfill_thread.join()
+    registry.close()
+    log_tool_cache_stats()
+    if metrics_server:
+        metrics_server.shutdown()
+    logger.info("常驻模式已退出")
+
+def main():
+    """主函数"""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description='对标账号数据采集工具')
+    parser.add_argument('--test-mode', action='store_true', help='使用测试模式(模拟数据)')
+    parser.add_argument('--mock-only', action='store_true', help='只生成模拟数据，不发送到飞书')
+    parser.add_argument('--no-dedupe', action='store_true', help='不检查已发送记录，发送全部抓取内容')
+    parser.add_argument('--max-workers', type=int, default=SCRAPE_MAX_WORKERS, help='全局并发抓取数上限')
+    parser.add_argument('--daemon', action='store_true', help='常驻运行，按配置的间隔周期性抓取')
+    parser.add_argument('--backfill', action='store_true', help='回填历史内容；与--daemon同时使用时在后台低优先级运行')
+    parser.add_argument('--backfill-since', help='回填截止日期(YYYY-MM-DD)，默认最近BACKFILL_SINCE_DAYS天')
+    parser.add_argument('--backfill-deep', action='store_true', help='遇到已发送的帖子时不停止，一直回填到截止日期')
+    parser.add_argument('--backfill-restart', action='store_true', help='忽略保存的回填游标，从最新一页重新开始')
+    parser.add_argument('--shard-index', type=int, help='静态分片：本实例负责的分片序号(从0开始)')
+    parser.add_argument('--shard-count', type=int, help='静态分片：分片总数')
+    parser.add_argument('--shard-lease', help='动态分片：各实例共享的租约数据库路径')
+    parser.add_argument('--reparse-cache', action='store_true', help='用当前的提取器重新解析缓存的原始页面')
+    args = parser.parse_args()
+    if (args.shard_lease if args.shard_lease is not None else SHARD_LEASE_PATH) and not args.daemon:
+        # 单次运行只能看到自己的心跳，每个实例都会抓取全部账号
+        parser.error('动态分片(--shard-lease/SHARD_LEASE_PATH)只能与--daemon一起使用')
+    
+    # 确保日志目录存在
+    os.makedirs("coordinator", exist_ok=True)
+    
+    if args.mock_only:
+        logger.info("模拟模式：跳过发送到飞书的步骤")
+    elif FEISHU_WRITE_MODE == 'direct':
+        # 直接写入时在后台提前刷新访问令牌，写入请求不必等待获取令牌
+        logger.info("直接写入飞书多维表格(更新已有记录)")
+        token_cache.start()
+    
+    # 只发送新帖子和互动数据有变化的帖子
+    seen_index = None if args.no_dedupe else SeenIndex()
+    # 按平台和日期分区的压缩备份
+    backup_store = BackupStore()
+    # 帖子互动数据的时间序列
+    engagement_store = EngagementStore()
+    # 原始页面缓存：页面未变化时跳过解析；--no-dedupe需要每次发送全部内容，因此不启用
+    html_cache = HtmlCache() if args.reparse_cache or (HTML_CACHE_ENABLED and not args.no_dedupe) else None
+    # 多实例分片：只抓取本实例负责的账号
+    sharder = create_sharder(args.shard_index, args.shard_count, args.shard_lease)
+    if sharder:
+        logger.info(f"分片模式: {sharder.describe()}")
+    # 近似重复检测：跨账号、跨平台的转发只发送一条代表记录
+    near_dup = NearDupIndex() if NEAR_DUP_ENABLED else None
+    
+    try:
+        if args.reparse_cache:
+            run_reparse(args, seen_index, backup_store, engagement_store, html_cache, near_dup)
+        elif args.daemon and not args.test_mode:
+            run_daemon(args, seen_index, backup_store, engagement_store, html_cache, sharder, near_dup)
+        elif args.backfill and not args.test_mode:
+            run_backfill(args, seen_index, backup_store, engagement_store, html_cache=html_cache, sharder=sharder,
+                         near_dup=near_dup)
+            log_tool_cache_stats()
+            metrics.write_summary()
+        else:
+            run_once(args, seen_index, backup_store, engagement_store, html_cache, sharder, near_dup)
+    finally:
+        if seen_index:
+            seen_index.close()
+        if html_cache:
+            html_cache.close()
+        if sharder:
+            sharder.close()
+        if near_dup:
+            near_dup.close()
+        engagement_store.close()
+        extract_pool.shutdown()
+        token_cache.stop()
+        bitable_writer.close()
+        http_client.close_all()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,147 @@
+import os
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from sqlite_store import connect, select_in
+
+logger = logging.getLogger(__name__)
+
+# 已发送帖子索引的存放位置
+SEEN_INDEX_PATH = os.getenv('SEEN_INDEX_PATH', 'coordinator/state/seen_posts.db')
+
+# 时间戳来自页面绝对时间、可作为指纹一部分的平台
+# 小红书页面只给出"3小时前"这类相对时间，每次抓取换算结果都不同，只能按内容识别
+STABLE_TIMESTAMP_PLATFORMS = {'twitter'}
+
+# 参与变化判断的互动字段
+ENGAGEMENT_FIELDS = ('likes', 'retweets', 'replies', 'comments', 'shares')
+
+def post_fingerprint(item):
+    """计算帖子的稳定指纹：平台 + 账号 + 规范化内容(+ 绝对发布时间)"""
+    platform = item.get("platform", "")
+    content = ' '.join(item.get("content", "").split())
+    parts = [platform, item.get("username", ""), content]
+    if platform in STABLE_TIMESTAMP_PLATFORMS:
+        parts.append(item.get("timestamp", ""))
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).digest()
+
+def engagement_signature(item):
+    """互动数据签名，用于判断计数是否变化"""
+    return ','.join(str(item.get(field, 0)) for field in ENGAGEMENT_FIELDS)
+
+class SeenIndex:
+    """基于SQLite主键索引的已发送帖子记录
+
+    以16字节指纹为主键(WITHOUT ROWID表)，查询只走主键B树，
+    即使索引增长到数百万条帖子，单次查找也只需几次页访问。
+    """
+
+    def __init__(self, path=SEEN_INDEX_PATH):
+        self._lock = threading.Lock()
+        # 已被某个管道认领、正在发送的帖子: 指纹 → 认领者
+        # 常驻模式下常规抓取和历史回填会同时拿到账号最新一页，认领后另一方不再重复发送
+        self._in_flight = {}
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_posts ("
+            "key BLOB PRIMARY KEY, "
+            "counters TEXT NOT NULL, "
+            "first_seen TEXT NOT NULL, "
+            "last_seen TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def _lookup(self, keys):
+        """批量查询指纹对应的互动签名"""
+        return dict(select_in(
+            self._conn, "SELECT key, counters FROM seen_posts WHERE key IN ({placeholders})", keys
+        ))
+
+    def classify(self, items, owner=None):
+        """将内容分为新帖子和互动数据有变化的帖子，未变化的帖子被丢弃
+
+        同一批次中重复出现的帖子只保留第一条。提供owner时认领返回的帖子，
+        直到mark或release之前，其他调用者对这些帖子的classify都将其视为未变化。
+        """
+        keyed = {}
+        for item in items:
+            keyed.setdefault(post_fingerprint(item), item)
+
+        new_items = []
+        changed_items = []
+        with self._lock:
+            known = self._lookup(keyed.keys())
+            for key, item in keyed.items():
+                if key in self._in_flight:
+                    continue
+                counters = known.get(key)
+                if counters is None:
+                    new_items.append(item)
+                elif counters != engagement_signature(item):
+                    changed_items.append(item)
+                else:
+                    continue
+                if owner is not None:
+                    self._in_flight[key] = owner
+        return new_items, changed_items
+
+    def count_seen(self, items, before=None):
+        """统计内容中已经记录过的帖子数(同一帖子只计一次)
+
+        提供before(ISO时间)时只统计在此之前首次记录的帖子；正在发送的帖子不计入。
+        """
+        keys = list({post_fingerprint(item) for item in items})
+        query = "SELECT COUNT(*) FROM seen_posts WHERE key IN ({placeholders})"
+        params = ()
+        if before is not None:
+            query += " AND first_seen < ?"
+            params = (before,)
+        with self._lock:
+            return sum(row[0] for row in select_in(self._conn, query, keys, params))
+
+    def held_by_others(self, items, owner):
+        """内容中是否有帖子正由其他认领者发送"""
+        keys = {post_fingerprint(item) for item in items}
+        with self._lock:
+            return any(self._in_flight.get(key, owner) is not owner for key in keys)
+
+    def release(self, items=None, owner=None):
+        """放弃认领(发送失败)，下次classify时重新判断；提供owner时释放该认领者的全部帖子"""
+        with self._lock:
+            if owner is not None:
+                for key in [key for key, holder in self._in_flight.items() if holder is owner]:
+                    del self._in_flight[key]
+            for item in items or ():
+                self._in_flight.pop(post_fingerprint(item), None)
+
+    def mark(self, items):
+        """记录已发送的帖子及其当前互动数据"""
+        now = datetime.now().isoformat()
+        rows = [(post_fingerprint(item), engagement_signature(item), now, now) for item in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO seen_posts (key, counters, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET counters = excluded.counters, last_seen = excluded.last_seen",
+                rows
+            )
+            self._conn.commit()
+            for key, _, _, _ in rows:
+                self._in_flight.pop(key, None)
+
+    def seed(self, rows):
+        """导入其他实例记录的已发送帖子[(指纹, 互动签名)]"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO seen_posts (key, counters, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET counters = excluded.counters",
+                [(key, counters, now, now) for key, counters in rows]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,203 @@
+import os
+import time
+import bisect
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# 静态分片：共SHARD_COUNT个实例，本实例负责第SHARD_INDEX片(从0开始)
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '1'))
+SHARD_INDEX = int(os.getenv('SHARD_INDEX', '0'))
+# 动态分片：各实例共享的租约数据库，设置后按存活节点做一致性哈希，节点宕机时自动重新分配
+# 多台机器时放在共享存储上(需支持文件锁)；只能与--daemon一起使用。
+# 各节点的去重状态(已发送索引、record_id映射)保存在本地，发送成功的帖子同时登记到租约数据库，
+# 账号转移到新节点时由新节点导入，不会被当作新帖子重新发送
+SHARD_LEASE_PATH = os.getenv('SHARD_LEASE_PATH', '')
+SHARD_NODE_ID = os.getenv('SHARD_NODE_ID', f"{socket.gethostname()}-{os.getpid()}")
+# 节点心跳超过该秒数未更新即视为宕机
+SHARD_LEASE_TTL = float(os.getenv('SHARD_LEASE_TTL', '60'))
+# 每个节点在哈希环上的虚拟节点数，越多分配越均匀
+SHARD_VNODES = int(os.getenv('SHARD_VNODES', '64'))
+
+def account_key(platform, username):
+    return f"{platform}:{username}"
+
+def stable_hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def filter_accounts(target_accounts, owns):
+    """按owns(平台, 账号)筛选出本实例负责的账号"""
+    assigned = {}
+    for platform, accounts in target_accounts.items():
+        mine = [username for username in accounts if owns(platform, username)]
+        if mine:
+            assigned[platform] = mine
+    return assigned
+
+class HashRing:
+    """一致性哈希环，节点增减时只有相邻区间的账号换节点"""
+
+    def __init__(self, nodes, vnodes=SHARD_VNODES):
+        points = sorted(
+            (stable_hash(f"{node}#{replica}"), node) for node in nodes for replica in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        if not self._nodes:
+            return None
+        index = bisect.bisect(self._hashes, stable_hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+class StaticSharder:
+    """按账号哈希取模的固定分片"""
+
+    def __init__(self, index=SHARD_INDEX, count=SHARD_COUNT):
+        if not 0 <= index < count:
+            raise ValueError(f"分片序号{index}超出范围(共{count}片)")
+        self.index = index
+        self.count = count
+
+    def owns(self, platform, username):
+        return stable_hash(account_key(platform, username)) % self.count == self.index
+
+    def assign(self, target_accounts):
+        return filter_accounts(target_accounts, self.owns)
+
+    def refresh(self):
+        """固定分片不会变化"""
+        return False
+
+    def publish(self, posts):
+        """固定分片的账号不会转移到其他实例，不需要登记"""
+
+    def sent_posts(self, accounts):
+        return []
+
+    def describe(self):
+        return f"静态分片{self.index + 1}/{self.count}"
+
+    def close(self):
+        pass
+
+class LeaseSharder:
+    """基于SQLite租约的动态分片
+
+    每个节点在后台线程中定期写入心跳(抓取周期很长时也不会被误判为宕机)，
+    存活节点(心跳未超过TTL)组成一致性哈希环，每个节点只负责环上映射到自己的账号。
+    节点宕机后其租约过期，其余节点在下一次refresh时接管它的账号；节点退出时主动释放租约。
+    """
+
+    def __init__(self, path=SHARD_LEASE_PATH, node_id=SHARD_NODE_ID, ttl=SHARD_LEASE_TTL, vnodes=SHARD_VNODES):
+        self.node_id = node_id
+        self.ttl = ttl
+        self.vnodes = vnodes
+        self.nodes = ()
+        self._ring = HashRing([node_id], vnodes)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # 共享存储上不能使用WAL(依赖共享内存)，保持默认的回滚日志
+        self._conn = connect(path, wal=False, synchronous=None, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shard_nodes ("
+            "node_id TEXT PRIMARY KEY, "
+            "heartbeat REAL NOT NULL"
+            ")"
+        )
+        # 各节点已发送的帖子，按账号聚簇，账号转移时新节点按账号导入
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shard_posts ("
+            "account TEXT NOT NULL, "
+            "key BLOB NOT NULL, "
+            "counters TEXT NOT NULL, "
+            "record_id TEXT, "
+            "PRIMARY KEY (account, key)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self.refresh()
+        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+
+    def _beat(self, now):
+        self._conn.execute("INSERT OR REPLACE INTO shard_nodes VALUES (?, ?)", (self.node_id, now))
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                with self._lock, self._conn:
+                    self._beat(time.time())
+            except sqlite3.Error as e:
+                logger.warning(f"写入分片心跳失败: {str(e)}")
+
+    def refresh(self, now=None):
+        """写入心跳并读取存活节点，节点集合变化时返回True"""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._beat(now)
+            self._conn.execute("DELETE FROM shard_nodes WHERE heartbeat < ?", (now - self.ttl,))
+            nodes = tuple(sorted(row[0] for row in self._conn.execute("SELECT node_id FROM shard_nodes")))
+        if nodes == self.nodes:
+            return False
+        logger.info(f"分片节点变化: {list(self.nodes)} → {list(nodes)}")
+        self.nodes = nodes
+        self._ring = HashRing(nodes, self.vnodes)
+        return True
+
+    def owns(self, platform, username):
+        return self._ring.node_for(account_key(platform, username)) == self.node_id
+
+    def assign(self, target_accounts):
+        return filter_accounts(target_accounts, self.owns)
+
+    def publish(self, posts):
+        """登记本节点已发送的帖子[(平台, 账号, 指纹, 互动签名, record_id)]"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO shard_posts VALUES (?, ?, ?, ?) ON CONFLICT(account, key) DO UPDATE SET "
+                "counters = excluded.counters, record_id = COALESCE(excluded.record_id, record_id)",
+                [(account_key(platform, username), key, counters, record_id)
+                 for platform, username, key, counters, record_id in posts]
+            )
+
+    def sent_posts(self, accounts):
+        """其他节点登记过的账号已发送帖子，返回[(指纹, 互动签名, record_id)]"""
+        rows = []
+        with self._lock:
+            for platform, username in accounts:
+                rows.extend(self._conn.execute(
+                    "SELECT key, counters, record_id FROM shard_posts WHERE account = ?",
+                    (account_key(platform, username),)
+                ))
+        return rows
+
+    def describe(self):
+        return f"动态分片(节点{self.node_id}，共{len(self.nodes)}个存活节点)"
+
+    def close(self):
+        """释放租约，其余节点立即接管本节点的账号"""
+        self._stop.set()
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("DELETE FROM shard_nodes WHERE node_id = ?", (self.node_id,))
+            finally:
+                self._conn.close()
+
+def create_sharder(shard_index=None, shard_count=None, lease_path=None):
+    """根据配置创建分片器，未启用分片时返回None"""
+    lease_path = SHARD_LEASE_PATH if lease_path is None else lease_path
+    if lease_path:
+        return LeaseSharder(lease_path)
+    shard_count = SHARD_COUNT if shard_count is None else shard_count
+    shard_index = SHARD_INDEX if shard_index is None else shard_index
+    if shard_count == 1 and shard_index == 0:
+        return None
+    # 只给出序号而未设置分片数时不能静默地抓取全部账号，交给StaticSharder校验报错
+    return StaticSharder(shard_index, shard_count)
@@ -0,0 +1,31 @@
+import os
+import sqlite3
+
+# SQLite单条语句的参数个数上限以内分批查询
+QUERY_CHUNK = 500
+
+def connect(path, wal=True, synchronous='NORMAL', **kwargs):
+    """打开状态数据库，不存在的目录会自动创建
+
+    连接可在线程间共享，由调用方加锁串行访问。默认启用WAL并把同步级别降为NORMAL
+    (断电时可能丢失最后几个事务，但不会损坏数据库)；synchronous为None时保持默认的FULL。
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, **kwargs)
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
+
+def select_in(conn, query, keys, params=()):
+    """按QUERY_CHUNK分批执行IN (...)查询，依次产出结果行
+
+    query中的{placeholders}替换为当前批次的占位符，params追加在批次参数之后。
+    """
+    keys = list(keys)
+    for start in range(0, len(keys), QUERY_CHUNK):
+        chunk = keys[start:start + QUERY_CHUNK]
+        yield from conn.execute(query.format(placeholders=','.join('?' * len(chunk))), chunk + list(params))
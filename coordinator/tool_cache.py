@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 抓取工具描述的磁盘缓存，CLI每次启动时复用
+TOOL_CACHE_PATH = os.getenv('TOOL_CACHE_PATH', 'coordinator/state/scrape_tool.json')
+# 缓存有效期(秒)，过期后仍先返回旧值，同时在后台刷新
+TOOL_CACHE_TTL = int(os.getenv('TOOL_CACHE_TTL', '3600'))
+
+class ToolCache:
+    """工具描述缓存，采用stale-while-revalidate策略
+
+    - 缓存未过期：直接返回
+    - 缓存已过期：立即返回旧值，后台刷新；刷新失败时继续使用旧值
+    - 没有缓存：同步获取
+    """
+
+    def __init__(self, discover, path=TOOL_CACHE_PATH, ttl=TOOL_CACHE_TTL):
+        self.discover = discover
+        self.path = path
+        self.ttl = ttl
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refresh_failures": 0}
+        self._tool = None
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            self._tool = entry["tool"]
+            self._fetched_at = entry["fetched_at"]
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, KeyError) as e:
+            logger.warning(f"抓取工具缓存文件无效，忽略: {str(e)}")
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"tool": self._tool, "fetched_at": self._fetched_at}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def _fetch(self):
+        """调用discover获取工具，成功时更新缓存"""
+        tool = self.discover()
+        if not tool:
+            with self._lock:
+                self.stats["refresh_failures"] += 1
+            return None
+        with self._lock:
+            self._tool = tool
+            self._fetched_at = time.time()
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"保存抓取工具缓存失败: {str(e)}")
+        return tool
+
+    def _background_refresh(self):
+        try:
+            if self._fetch():
+                logger.info("抓取工具缓存已在后台刷新")
+            else:
+                logger.warning("后台刷新抓取工具失败，继续使用缓存的工具")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self):
+        """获取抓取工具描述"""
+        with self._lock:
+            tool = self._tool
+            fresh = tool is not None and time.time() - self._fetched_at < self.ttl
+            if fresh:
+                self.stats["hits"] += 1
+                return tool
+            if tool is not None:
+                self.stats["stale_hits"] += 1
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, daemon=True).start()
+                return tool
+            self.stats["misses"] += 1
+
+        return self._fetch()
+
+    def invalidate(self, tool=None):
+        """标记缓存过期(同时写入磁盘，下次启动也不再当作有效)，下次获取时刷新
+
+        提供tool时只在缓存的仍是该工具描述时失效，避免把刚刷新的描述也标记为过期。
+        """
+        with self._lock:
+            if tool is not None and tool != self._tool:
+                return
+            self._fetched_at = 0
+            if self._tool is None:
+                return
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"保存抓取工具缓存失败: {str(e)}")
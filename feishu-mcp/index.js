@@ -12,20 +12,72 @@ const FEISHU_APP_SECRET = process.env.FEISHU_APP_SECRET;
 const FEISHU_BITABLE_ID = process.env.FEISHU_BITABLE_ID;
 const FEISHU_TABLE_ID = process.env.FEISHU_TABLE_ID;
 
+// 令牌距离过期不足该秒数时提前刷新(令牌有效期约2小时)
+const TOKEN_REFRESH_AHEAD_MS = parseInt(process.env.FEISHU_TOKEN_REFRESH_AHEAD || '300', 10) * 1000;
+// 令牌无效或过期的错误码，收到后丢弃缓存重新获取
+const TOKEN_INVALID_CODES = new Set([99991661, 99991663, 99991668]);
+// 连接阶段就失败的错误，请求没有到达飞书，可以安全重发
+const CONNECT_ERROR_CODES = new Set(['ECONNREFUSED', 'ENOTFOUND', 'EAI_AGAIN', 'EHOSTUNREACH', 'ENETUNREACH']);
+
+// 令牌缓存：并发请求共享同一次获取，过期前由定时器在后台刷新
+let cachedToken = null;
+let tokenExpiresAt = 0;
+let pendingToken = null;
+let refreshTimer = null;
+
+async function fetchAccessToken() {
+  const response = await axios.post('https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal', {
+    app_id: FEISHU_APP_ID,
+    app_secret: FEISHU_APP_SECRET
+  });
+  if (response.data.code !== 0) {
+    throw new Error(`获取飞书令牌失败: ${response.data.msg}`);
+  }
+  cachedToken = response.data.tenant_access_token;
+  tokenExpiresAt = Date.now() + (response.data.expire || 7200) * 1000;
+  scheduleRefresh();
+  return cachedToken;
+}
+
+function scheduleRefresh() {
+  clearTimeout(refreshTimer);
+  const delay = Math.max(1000, tokenExpiresAt - TOKEN_REFRESH_AHEAD_MS - Date.now());
+  refreshTimer = setTimeout(() => {
+    getAccessToken(true).catch(error => console.error('后台刷新飞书令牌失败:', error.message));
+  }, delay);
+  refreshTimer.unref();
+}
+
 // 获取飞书访问令牌
-async function getAccessToken() {
-  try {
-    const response = await axios.post('https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal', {
-      app_id: FEISHU_APP_ID,
-      app_secret: FEISHU_APP_SECRET
+async function getAccessToken(forceRefresh = false) {
+  if (!forceRefresh && cachedToken && Date.now() < tokenExpiresAt - TOKEN_REFRESH_AHEAD_MS) {
+    return cachedToken;
+  }
+  if (!pendingToken) {
+    pendingToken = fetchAccessToken().finally(() => {
+      pendingToken = null;
     });
-    return response.data.tenant_access_token;
+  }
+  try {
+    return await pendingToken;
   } catch (error) {
+    // 提前刷新失败但令牌尚未真正过期时继续使用
+    if (cachedToken && Date.now() < tokenExpiresAt) {
+      scheduleRefresh();
+      return cachedToken;
+    }
     console.error('获取飞书令牌失败:', error);
     throw error;
   }
 }
 
+function invalidateToken(token) {
+  if (token === cachedToken) {
+    cachedToken = null;
+    tokenExpiresAt = 0;
+  }
+}
+
 // MCP工具定义
 app.post('/tools', (req, res) => {
   res.json({
@@ -61,15 +113,39 @@ app.post('/tools', (req, res) => {
 // MCP工具实现
 app.post('/tools/:operation_id', async (req, res) => {
   if (req.params.operation_id === 'append_to_bitable') {
+    // 写入请求是否已发往飞书：发出后没有收到响应时无法确认是否已写入
+    let requestSent = false;
     try {
-      const token = await getAccessToken();
       const { records } = req.body.parameters;
+      const url = `https://open.feishu.cn/open-apis/bitable/v1/apps/${FEISHU_BITABLE_ID}/tables/${FEISHU_TABLE_ID}/records/batch_create`;
       
-      const response = await axios.post(
-        `https://open.feishu.cn/open-apis/bitable/v1/apps/${FEISHU_BITABLE_ID}/tables/${FEISHU_TABLE_ID}/records/batch_create`,
-        { records },
-        { headers: { 'Authorization': `Bearer ${token}` } }
-      );
+      let token = await getAccessToken();
+      let response;
+      try {
+        requestSent = true;
+        response = await axios.post(url, { records }, { headers: { 'Authorization': `Bearer ${token}` } });
+      } catch (error) {
+        // 令牌被判定无效时重新获取并重试一次；其余错误交给调用方处理
+        const code = error.response && error.response.data && error.response.data.code;
+        if (!TOKEN_INVALID_CODES.has(code)) {
+          throw error;
+        }
+        invalidateToken(token);
+        token = await getAccessToken();
+        response = await axios.post(url, { records }, { headers: { 'Authorization': `Bearer ${token}` } });
+      }
+      
+      // 飞书以HTTP 200 + 非0错误码拒绝写入，此时整批都未写入
+      if (response.data.code !== 0) {
+        res.json({
+          result: {
+            success: false,
+            message: `飞书拒绝写入: 错误码${response.data.code} ${response.data.msg || ''}`,
+            details: response.data
+          }
+        });
+        return;
+      }
       
       res.json({
         result: {
@@ -79,6 +155,17 @@ app.post('/tools/:operation_id', async (req, res) => {
         }
       });
     } catch (error) {
+      // 请求已发出但连接中断或超时(没有响应)：飞书可能已经写入，标记为结果未知，调用方不应重发
+      if (requestSent && error.request && !error.response && !CONNECT_ERROR_CODES.has(error.code)) {
+        res.json({
+          result: {
+            success: false,
+            unknown: true,
+            message: `无法确认是否已写入飞书: ${error.message}`
+          }
+        });
+        return;
+      }
       res.json({
         result: {
           success: false,
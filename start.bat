@@ -21,9 +21,10 @@ echo.
 echo 菜单选项:
 echo 1. 打开对标账号配置页面
 echo 2. 运行数据采集脚本
-echo 3. 退出程序
+echo 3. 常驻运行数据采集(按间隔自动抓取)
+echo 4. 退出程序
 echo.
-set /p choice=请选择操作 (1/2/3): 
+set /p choice=请选择操作 (1/2/3/4): 
 
 if "%choice%"=="1" (
     start http://localhost:8080
@@ -33,6 +34,10 @@ if "%choice%"=="1" (
     python coordinator/scraper.py
     goto menu
 ) else if "%choice%"=="3" (
+    echo 常驻运行协调脚本，按Ctrl+C停止...
+    python coordinator/scraper.py --daemon
+    goto menu
+) else if "%choice%"=="4" (
     echo 关闭所有服务...
     taskkill /f /im node.exe
     taskkill /f /im python.exe
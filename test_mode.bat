@@ -9,7 +9,7 @@ python coordinator/scraper.py --test-mode
 
 echo.
 echo 测试完成！模拟数据已生成并处理
-echo 您可以检查 coordinator/backup 目录查看备份的数据文件
+echo 您可以检查 coordinator/backup 目录查看备份的数据文件(按平台和日期分区的.jsonl.gz)
 echo.
 echo 注意：此测试模式不依赖web-scraper-mcp服务，仅使用模拟数据进行测试
 